@@ -1,49 +1,212 @@
 import os
+import sys
+import atexit
 import logging
+import threading
+from queue import SimpleQueue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import structlog
 
-class CustomLogger:
-    def __init__(self, log_dir="logs"):
-        # Ensure logs directory exists
-        self.logs_dir = os.path.join(os.getcwd(), log_dir)
-        os.makedirs(self.logs_dir, exist_ok=True)
 
-        # Timestamped log file (for persistence)
-        log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-        self.log_file_path = os.path.join(self.logs_dir, log_file)
-        print(f"Log file path: {self.log_file_path}")
-        
-    def get_logger(self, name=__file__):
-        logger_name = os.path.basename(name)
+class _DeferredFlushMixin:
+    """Handlers flush once per batch (driven by the listener) instead of once per record."""
+    def flush(self):
+        pass
 
-        # Configure logging for console + file (both JSON)
-        file_handler = logging.FileHandler(self.log_file_path)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter("%(message)s"))  # Raw JSON lines
+    def flush_batch(self):
+        super().flush()
 
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter("%(message)s"))
 
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(message)s",  # Structlog will handle JSON rendering
-            handlers=[console_handler, file_handler]
-        )
+class _BatchedRotatingFileHandler(_DeferredFlushMixin, RotatingFileHandler):
+    pass
+
+
+class _BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    """Console sink writing to the current sys.stderr, like logging's last-resort handler."""
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _LazyStartQueueHandler(QueueHandler):
+    """
+    Starts the backend's listener on the first record in a process where none runs
+    and no parent listener takes its records, so loggers created before a fork keep
+    logging in the child.
+    """
+    def emit(self, record):
+        if _LogBackend.listener is None and not _LogBackend.forwarding:
+            _LogBackend.restart()
+        super().emit(record)
+
+    def enqueue(self, record):
+        # multiprocessing's SimpleQueue has no put_nowait
+        self.queue.put(record)
+
+
+def _forward_records(fork_queue, queue) -> None:
+    """Moves records logged by forked children onto this process's listener queue."""
+    while True:
+        record = fork_queue.get()
+        if record is None:
+            return
+        queue.put(record)
+
+
+class _BatchingQueueListener(QueueListener):
+    """
+    Writes records on a background thread and flushes the sinks whenever the queue
+    is drained or batch_size records are pending, so bursts become batched writes.
+    """
+    def __init__(self, queue, *handlers, batch_size: int = 256):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self._pending = 0
+
+    def handle(self, record):
+        super().handle(record)
+        self._pending += 1
+        if self._pending >= self.batch_size or self.queue.empty():
+            for handler in self.handlers:
+                handler.flush_batch()
+            self._pending = 0
 
-        # Configure structlog for JSON structured logging
-        structlog.configure(
-            processors=[
-                structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
-                structlog.processors.add_log_level,
-                structlog.processors.EventRenamer(to="event"),
-                structlog.processors.JSONRenderer()
-            ],
-            logger_factory=structlog.stdlib.LoggerFactory(),
-            cache_logger_on_first_use=True,
-        )
 
+class _LogBackend:
+    """
+    Process-wide logging backend: a single QueueHandler on the root logger feeds one
+    listener thread that owns the console handler and one rotating JSON log file.
+    Callers only pay for rendering the JSON line and a queue put.
+
+    Children forked while the listener runs send their records to it over a
+    multiprocessing queue instead of opening a file of their own, so the parent's
+    file stays the only rotating sink and its listener the only writer.
+    """
+    lock = threading.Lock()
+    listener = None
+    fork_queue = None
+    forwarder = None
+    forwarding = False
+    queue_handler = None
+    log_file_path = None
+    settings = None
+    configured = False
+
+    @classmethod
+    def start(cls, logs_dir: str, max_bytes: int, backup_count: int) -> str:
+        with cls.lock:
+            if cls.listener is not None or cls.forwarding:
+                return cls.log_file_path
+
+            cls.settings = (logs_dir, max_bytes, backup_count)
+            os.makedirs(logs_dir, exist_ok=True)
+            # Timestamped log file (for persistence), rotated by size
+            log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+            cls.log_file_path = os.path.join(logs_dir, log_file)
+
+            file_handler = _BatchedRotatingFileHandler(cls.log_file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(logging.Formatter("%(message)s"))  # Raw JSON lines
+
+            console_handler = _BatchedStreamHandler()
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(logging.Formatter("%(message)s"))
+
+            queue = SimpleQueue()
+            if cls.queue_handler is None:
+                cls.queue_handler = _LazyStartQueueHandler(queue)
+                root = logging.getLogger()
+                root.setLevel(logging.INFO)
+                root.addHandler(cls.queue_handler)
+            else:
+                # restarted in a forked child: records queued in the parent are the parent's to write
+                cls.queue_handler.queue = queue
+
+            cls.listener = _BatchingQueueListener(queue, console_handler, file_handler)
+            cls.listener.start()
+            import multiprocessing
+            from multiprocessing import util
+            cls.fork_queue = multiprocessing.SimpleQueue()
+            cls.forwarder = threading.Thread(target=_forward_records, args=(cls.fork_queue, queue), daemon=True)
+            cls.forwarder.start()
+            # multiprocessing workers leave through os._exit, which skips atexit
+            util.Finalize(None, cls.stop, exitpriority=100)
+
+            if cls.configured:
+                return cls.log_file_path
+            cls.configured = True
+            # Configure structlog for JSON structured logging, once per process
+            structlog.configure(
+                processors=[
+                    structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
+                    structlog.processors.add_log_level,
+                    structlog.processors.EventRenamer(to="event"),
+                    structlog.processors.JSONRenderer()
+                ],
+                logger_factory=structlog.stdlib.LoggerFactory(),
+                cache_logger_on_first_use=True,
+            )
+            print(f"Log file path: {cls.log_file_path}")
+            return cls.log_file_path
+
+    @classmethod
+    def restart(cls) -> None:
+        """Start the listener again with the last settings, e.g. in a forked child."""
+        if cls.settings is not None:
+            cls.start(*cls.settings)
+
+    @classmethod
+    def stop(cls):
+        with cls.lock:
+            if cls.listener is not None:
+                # forward what children already sent before the listener drains its queue
+                cls.fork_queue.put(None)
+                cls.forwarder.join()
+                cls.fork_queue = None
+                cls.forwarder = None
+                cls.listener.stop()
+                for handler in cls.listener.handlers:
+                    handler.flush_batch()
+                    handler.close()
+                logging.getLogger().removeHandler(cls.queue_handler)
+                cls.listener = None
+                cls.queue_handler = None
+
+    @classmethod
+    def reset_after_fork(cls):
+        # the listener thread does not survive fork: send records to the parent's
+        # listener if one was running, otherwise the queue handler starts a new
+        # listener on the child's first record
+        cls.lock = threading.Lock()
+        cls.listener = None
+        cls.forwarder = None
+        cls.forwarding = cls.fork_queue is not None and cls.queue_handler is not None
+        if cls.forwarding:
+            cls.queue_handler.queue = cls.fork_queue
+
+
+atexit.register(_LogBackend.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_LogBackend.reset_after_fork)
+
+
+class CustomLogger:
+    def __init__(self, log_dir="logs", max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        # Ensure logs directory exists; the backend is shared by every CustomLogger
+        self.logs_dir = os.path.join(os.getcwd(), log_dir)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.log_file_path = _LogBackend.start(self.logs_dir, max_bytes, backup_count)
+        
+    def get_logger(self, name=__file__):
+        logger_name = os.path.basename(name)
+        if _LogBackend.listener is None and not _LogBackend.forwarding:
+            self.log_file_path = _LogBackend.start(self.logs_dir, self.max_bytes, self.backup_count)
         return structlog.get_logger(logger_name)
 
 
@@ -1,7 +1,5 @@
 #To keep pydantic models
 
-from unittest.mock import Base
-from langchain_text_splitters import Language
 from pydantic import BaseModel, Field, RootModel
 from typing import Optional, List, Dict, Any, Union
 from enum import Enum
@@ -28,4 +26,5 @@ class PromptType(str, Enum):
     DOCUMENT_ANALYSIS = "document_analysis"
     DOCUMENT_COMPARISON = "document_comparison"
     CONTEXTUALIZE_QUESTION = "contextualize_question"
-    CONTEXT_QA = "context_qa"
\ No newline at end of file
+    CONTEXT_QA = "context_qa"
+    SUMMARIZE_HISTORY = "summarize_history"
\ No newline at end of file
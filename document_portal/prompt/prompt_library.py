@@ -50,10 +50,22 @@ context_qa_prompt = ChatPromptTemplate.from_messages([
     ("human", "{input}"),
 ])
 
+# Prompt for rolling older chat turns into a running summary
+summarize_history_prompt = ChatPromptTemplate.from_messages([
+    ("system", (
+        "Condense the conversation below into a short summary that keeps the facts, names, numbers and open "
+        "questions needed to follow up on it. Extend the existing summary rather than repeating it.\n\n"
+        "Existing summary: {summary}"
+    )),
+    MessagesPlaceholder("chat_history"),
+    ("human", "Write the updated summary."),
+])
+
 # Central dictionary to register prompts
 PROMPT_REGISTRY = {
     "document_analysis": document_analysis_prompt,
     "document_comparison": document_comparison_prompt,
     "contextualize_question": contextualize_question_prompt,
     "context_qa": context_qa_prompt,
+    "summarize_history": summarize_history_prompt,
 }
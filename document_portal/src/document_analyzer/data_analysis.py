@@ -2,6 +2,7 @@ import os
 import sys
 from dotenv import load_dotenv
 import pydantic
+from typing import List, Optional
 from utils.model_loader import Model_Loader
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
@@ -25,7 +26,14 @@ class DocumentAnalyzer:
             self.parser = JsonOutputParser(pydantic_object=Metadata)
             self.fixing_parser = OutputFixingParser.from_llm(parser=self.parser, llm=self.llm)
             self.prompt = PROMPT_REGISTRY["document_analysis"]
-            self.log.info("DocumentAnalyzer initialized successfully")
+            # format instructions never change, so the chain is built once and reused
+            self.chain = (
+                self.prompt.partial(format_instructions=self.parser.get_format_instructions())
+                | self.llm
+                | self.fixing_parser
+            )
+            self.max_concurrency = self.loader.config.get("document_analysis", {}).get("max_concurrency", 8)
+            self.log.info("DocumentAnalyzer initialized successfully", max_concurrency=self.max_concurrency)
         except Exception as e:
             self.log.error(f"Error initializing DocumentAnalyzer: {e}")
             raise DocumentPortalException("Error initializing DocumentAnalyzer", sys) 
@@ -37,14 +45,7 @@ class DocumentAnalyzer:
         Analyze a document's text and extract structured metadata & summary.
         """
         try:
-            chain = self.prompt | self.llm | self.fixing_parser
-            
-            self.log.info("Meta-data analysis chain initialized")
-
-            response = chain.invoke({
-                "format_instructions": self.parser.get_format_instructions(),
-                "document_text": document_text
-            })
+            response = self.chain.invoke({"document_text": document_text})
 
             self.log.info("Metadata extraction successful", keys=list(response.keys()))
             
@@ -52,4 +53,47 @@ class DocumentAnalyzer:
         except Exception as e:
             self.log.error("Metadata analysis failed", error=str(e))
             raise DocumentPortalException("Metadata extraction failed",sys)
-    
+
+    def analyze_documents(self, document_texts: List[str], max_concurrency: Optional[int] = None) -> List[dict]:
+        """
+        Analyze many documents with bounded concurrency.
+        Results are returned in input order; a failed document yields {"error": ...}
+        instead of aborting the batch.
+        """
+        try:
+            responses = self.chain.batch(
+                [{"document_text": text} for text in document_texts],
+                config={"max_concurrency": max_concurrency or self.max_concurrency},
+                return_exceptions=True,
+            )
+            return self._collect_batch(responses)
+        except Exception as e:
+            self.log.error("Batch metadata analysis failed", error=str(e))
+            raise DocumentPortalException("Batch metadata extraction failed", sys)
+
+    async def aanalyze_documents(self, document_texts: List[str], max_concurrency: Optional[int] = None) -> List[dict]:
+        """
+        Async variant of analyze_documents.
+        """
+        try:
+            responses = await self.chain.abatch(
+                [{"document_text": text} for text in document_texts],
+                config={"max_concurrency": max_concurrency or self.max_concurrency},
+                return_exceptions=True,
+            )
+            return self._collect_batch(responses)
+        except Exception as e:
+            self.log.error("Async batch metadata analysis failed", error=str(e))
+            raise DocumentPortalException("Async batch metadata extraction failed", sys)
+
+    def _collect_batch(self, responses) -> List[dict]:
+        results = []
+        for index, response in enumerate(responses):
+            if isinstance(response, Exception):
+                self.log.error("Metadata analysis failed for document", index=index, error=str(response))
+                results.append({"error": str(response)})
+            else:
+                results.append(response)
+        failed = sum(1 for r in results if "error" in r)
+        self.log.info("Batch metadata extraction completed", total=len(results), failed=failed)
+        return results
@@ -5,6 +5,7 @@ import uuid
 from datetime import datetime
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
+from utils.file_io import read_upload, write_buffer, write_buffer_async
 
 class DocumentHandler:
     """
@@ -32,7 +33,11 @@ class DocumentHandler:
             raise DocumentPortalException("Error initializing DocumentHandler", sys)
         
 
-    def save_pdf(self,uploaded_file):
+    def save_pdf(self,uploaded_file, background: bool = False):
+        """
+        Persist an uploaded PDF into the session directory. With background=True the
+        chunked write runs on a background thread and the path is returned immediately.
+        """
         try:
             filename = os.path.basename(uploaded_file.name)
             
@@ -41,10 +46,12 @@ class DocumentHandler:
 
             save_path = os.path.join(self.session_path, filename)
             
-            with open(save_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            if background:
+                write_buffer_async(read_upload(uploaded_file), save_path)
+            else:
+                write_buffer(read_upload(uploaded_file), save_path)
 
-            self.log.info("PDF saved successfully", file=filename, save_path=save_path, session_id=self.session_id)
+            self.log.info("PDF saved successfully", file=filename, save_path=save_path, session_id=self.session_id, background=background)
             
             return save_path
         
@@ -52,15 +59,55 @@ class DocumentHandler:
             self.log.error(f"Error saving PDF: {e}")
             raise DocumentPortalException("Error saving PDF", e) from e
 
-    def read_pdf(self, pdf_path:str)->str:
+    def read_uploaded_pdf(self, uploaded_file, persist: bool = True) -> str:
+        """
+        Parse an uploaded PDF directly from its memory buffer, without a disk round-trip.
+        If persist is set, the file is still saved, but in the background.
+        """
         try:
-            text_chunks = []
-            with fitz.open(pdf_path) as doc:
+            if not uploaded_file.name.lower().endswith(".pdf"):
+                raise ValueError("Invalid file type. Only PDFs are allowed.")
+            if persist:
+                self.save_pdf(uploaded_file, background=True)
+            return self.read_pdf(read_upload(uploaded_file))
+        except Exception as e:
+            self.log.error(f"Error reading uploaded PDF: {e}")
+            raise DocumentPortalException("Error reading uploaded PDF", e) from e
+
+    @staticmethod
+    def _open_pdf(pdf_source):
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return fitz.open(stream=pdf_source, filetype="pdf")
+        return fitz.open(pdf_source)
+
+    def iter_pdf_pages(self, pdf_source):
+        """
+        Yield (page_number, text) for each page as it is extracted, so callers can
+        start processing before the whole PDF is parsed.
+        pdf_source is either a file path or the PDF's bytes.
+        """
+        pdf_path = pdf_source if isinstance(pdf_source, (str, os.PathLike)) else "<memory>"
+        try:
+            pages = 0
+            with self._open_pdf(pdf_source) as doc:
                 for page_num, page in enumerate(doc, start=1): # type: ignore
-                    text_chunks.append(f"\n--- Page {page_num} ---\n{page.get_text()}")
-            text = "\n".join(text_chunks)
+                    pages = page_num
+                    yield page_num, page.get_text()
+
+            self.log.info("PDF pages streamed", pdf_path=pdf_path, session_id=self.session_id, pages=pages)
+        except Exception as e:
+            self.log.error(f"Error reading PDF: {e}")
+            raise DocumentPortalException("Error reading PDF", e) from e
+
+    def read_pdf(self, pdf_source)->str:
+        pdf_path = pdf_source if isinstance(pdf_source, (str, os.PathLike)) else "<memory>"
+        try:
+            text = "\n".join(
+                f"\n--- Page {page_num} ---\n{page_text}"
+                for page_num, page_text in self.iter_pdf_pages(pdf_source)
+            )
 
-            self.log.info("PDF read successfully", pdf_path=pdf_path, session_id=self.session_id, pages=len(text_chunks))
+            self.log.info("PDF read successfully", pdf_path=pdf_path, session_id=self.session_id)
             return text
         except Exception as e:
             self.log.error(f"Error reading PDF: {e}")
@@ -1,9 +1,9 @@
-from pydoc import doc
 import sys
 from pathlib import Path
 import fitz
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
+from utils.file_io import read_upload, write_buffer, write_buffer_async, unique_name
 
 class DocumentIngestion:
     
@@ -24,47 +24,67 @@ class DocumentIngestion:
             self.log.error("Error deleting existing files", error=str(e))
             raise DocumentPortalException("Error deleting existing files", sys)
     
-    def save_uploaded_files(self, reference_file, actual_file): # ref file is v1 and act file is v2
+    def save_uploaded_files(self, reference_file, actual_file, background: bool = False): # ref file is v1 and act file is v2
         """
         Save uploaded files to the base directory.
+        With background=True the chunked writes run off the calling thread.
         """
         try:
             self.delete_existing_files()
             self.log.info("Existing files deleted successfully")
-            ref_path = self.base_path/reference_file.name
-            act_path = self.base_path/actual_file.name
+            taken = set()
+            ref_path = self.base_path/unique_name(reference_file.name, taken)
+            act_path = self.base_path/unique_name(actual_file.name, taken)
             if not reference_file.name.endswith(".pdf") or not actual_file.name.endswith(".pdf"):
                 raise  ValueError("Only PDF files are allowed")
             
-            with open(ref_path, "wb") as ref_f:
-                ref_f.write(reference_file.getbuffer())
-            with open(act_path, "wb") as act_f:
-                act_f.write(actual_file.getbuffer())
+            write = write_buffer_async if background else write_buffer
+            write(read_upload(reference_file), ref_path)
+            write(read_upload(actual_file), act_path)
                 
-            self.log.info("Files Saved", ref_file=str(ref_path), act_file=str(act_path))
+            self.log.info("Files Saved", ref_file=str(ref_path), act_file=str(act_path), background=background)
             return ref_path, act_path
         except Exception as e:
             self.log.error("Error saving uploaded files", error=str(e))
             raise DocumentPortalException("Error saving uploaded files", sys)
     
-    def read_pdf(self, pdf_path: Path)->str:
+    def iter_pdf_pages(self, pdf_path):
+        """
+        Yield (page_number, text) for every page as it is extracted.
+        pdf_path may also be the PDF's bytes, e.g. straight from an upload buffer.
+        """
+        in_memory = isinstance(pdf_path, (bytes, bytearray))
         try:
-            with fitz.open(pdf_path) as doc:
+            with (fitz.open(stream=pdf_path, filetype="pdf") if in_memory else fitz.open(pdf_path)) as doc:
                 if doc.is_encrypted:
-                    raise ValueError("PDF is encrypted and cannot be read: {pdf_path.name}")
-                all_text = []
+                    raise ValueError(f"PDF is encrypted and cannot be read: {'<memory>' if in_memory else Path(pdf_path).name}")
                 for page_num in range(doc.page_count):
                     page = doc.load_page(page_num)
-                    text = page.get_text()
-                    
-                    if text.strip():
-                        all_text.append(f"\n-- Page {page_num+1} -- \n {text}")
-                self.log.info("PDF read successfully",file = str(pdf_path),pages =len(all_text))
-                return "\n".join(all_text)
+                    yield page_num + 1, page.get_text()
+                self.log.info("PDF pages streamed", file="<memory>" if in_memory else str(pdf_path), pages=doc.page_count)
+        except Exception as e:
+            self.log.error("Error reading PDF file", error=str(e))
+            raise DocumentPortalException("Error reading PDF file", sys)
+
+    def read_pdf(self, pdf_path)->str:
+        try:
+            all_text = [
+                f"\n-- Page {page_num} -- \n {text}"
+                for page_num, text in self.iter_pdf_pages(pdf_path)
+                if text.strip()
+            ]
+            self.log.info("PDF read successfully",file = "<memory>" if isinstance(pdf_path, (bytes, bytearray)) else str(pdf_path),pages =len(all_text))
+            return "\n".join(all_text)
         except Exception as e:
             self.log.error("Error reading PDF file", error=str(e))
             raise DocumentPortalException("Error reading PDF file", sys)
     
+    def read_pages(self, pdf_path) -> list:
+        """
+        Return the text of every page, in order, for page-wise comparison.
+        """
+        return [text for _, text in self.iter_pdf_pages(pdf_path)]
+
     def combine_documents(self) -> str:
         """ Combines text from both reference and actual documents.
         """
@@ -87,4 +107,28 @@ class DocumentIngestion:
         except Exception as e:
             self.log.error("Error combining documents", error=str(e))
             raise DocumentPortalException("Error combining documents", sys)
-    
\ No newline at end of file
+
+    def combine_uploaded_documents(self, reference_file, actual_file, persist: bool = True) -> str:
+        """
+        Same output as combine_documents, but parsed straight from the upload buffers.
+        If persist is set, the files are still saved to the base directory in the background.
+        """
+        try:
+            # named as save_uploaded_files names them, so two uploads called report.pdf stay separate
+            taken = set()
+            uploads = [(unique_name(upload.name, taken), upload) for upload in (reference_file, actual_file)]
+            if not all(name.endswith(".pdf") for name, _ in uploads):
+                raise ValueError("Only PDF files are allowed")
+            if persist:
+                self.save_uploaded_files(reference_file, actual_file, background=True)
+
+            doc_parts = [
+                f"Document: {name}\n{self.read_pdf(read_upload(upload))}"
+                for name, upload in sorted(uploads, key=lambda item: item[0])
+            ]
+            combined_text = "\n\n".join(doc_parts)
+            self.log.info("Uploaded documents combined in memory", total_parts=len(doc_parts), persisted=persist)
+            return combined_text
+        except Exception as e:
+            self.log.error("Error combining uploaded documents", error=str(e))
+            raise DocumentPortalException("Error combining uploaded documents", sys)
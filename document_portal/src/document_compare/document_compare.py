@@ -1,6 +1,8 @@
+from __future__ import annotations
+import re
 import sys
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-import pandas as pd
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from models.model import *
@@ -8,6 +10,11 @@ from prompt.prompt_library import PROMPT_REGISTRY
 from langchain_core.output_parsers import JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
 from utils.model_loader import Model_Loader
+from src.document_compare.page_diff import align_pages, format_changed_pages, split_combined_documents
+from utils.tracing import get_tracer, TracingCallbackHandler
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class DocumentComparatorLLM:
@@ -20,6 +27,8 @@ class DocumentComparatorLLM:
         self.fixing_parser=OutputFixingParser.from_llm(parser=self.parser, llm=self.llm)
         self.prompt = PROMPT_REGISTRY.get("document_comparison") #can also be called this way
         self.chain = self.prompt | self.llm | self.parser 
+        self.compare_config = self.loader.config.get("document_compare", {})
+        self.tracer = get_tracer()
         self.log.info("DocumentComparatorLLM initialized with model and parser successfully")
         
         
@@ -27,14 +36,22 @@ class DocumentComparatorLLM:
     def compare_documents(self, combined_docs: str) -> pd.DataFrame:
         """
         Compares 2 documents and returns structured comparison as result.
+        Text in the combine_documents layout is split back into pages and compared
+        with compare_pages; anything else goes to the LLM in a single prompt.
         """
+        documents = split_combined_documents(combined_docs)
+        if len(documents) == 2 and all(pages for _, pages in documents):
+            (reference_name, reference_pages), (actual_name, actual_pages) = documents
+            return self.compare_pages(reference_pages, actual_pages, reference_name, actual_name)
         try:
+            self.log.info("Combined text is not split into pages, comparing in one prompt", documents=len(documents))
             inputs = {
                 "combined_docs": combined_docs,
                 "format_instructions": self.parser.get_format_instructions()
             }
             self.log.info("Starting document comparison", inputs=inputs)
-            response = self.chain.invoke(inputs)
+            with self.tracer.span("compare"):
+                response = self.chain.invoke(inputs, config=self._run_config)
             self.log.info("Document comparison completed successfully", response=response)
             
             return self._format_response(response)
@@ -42,11 +59,116 @@ class DocumentComparatorLLM:
             self.log.error("Error in document comparison", error=str(e))
             raise DocumentPortalException("Error in document comparison", sys)
         
+    def compare_pages(self, reference_pages: list, actual_pages: list,
+                      reference_name: str = "reference.pdf", actual_name: str = "actual.pdf") -> pd.DataFrame:
+        """
+        Compares 2 documents given as lists of page texts. Pages are hashed and aligned
+        locally first; identical pages become NO CHANGE rows without an LLM call. The
+        changed page pairs are split into overlapping windows that run concurrently
+        through the chain, and the partial results are merged page by page.
+        """
+        try:
+            with self.tracer.span("compare", pages=max(len(reference_pages), len(actual_pages))):
+                rows, windows, inputs = self._prepare_page_comparison(reference_pages, actual_pages, reference_name, actual_name)
+                responses = self.chain.batch(inputs, config=self._run_config) if inputs else []
+                return self._merge_page_comparison(rows, windows, responses)
+        except Exception as e:
+            self.log.error("Error in page-wise document comparison", error=str(e))
+            raise DocumentPortalException("Error in page-wise document comparison", sys)
+
+    async def acompare_pages(self, reference_pages: list, actual_pages: list,
+                             reference_name: str = "reference.pdf", actual_name: str = "actual.pdf") -> pd.DataFrame:
+        """
+        Async variant of compare_pages; windows run through chain.abatch.
+        """
+        try:
+            with self.tracer.span("compare", pages=max(len(reference_pages), len(actual_pages))):
+                rows, windows, inputs = self._prepare_page_comparison(reference_pages, actual_pages, reference_name, actual_name)
+                responses = await self.chain.abatch(inputs, config=self._run_config) if inputs else []
+                return self._merge_page_comparison(rows, windows, responses)
+        except Exception as e:
+            self.log.error("Error in async page-wise document comparison", error=str(e))
+            raise DocumentPortalException("Error in async page-wise document comparison", sys)
+
+    @property
+    def _run_config(self) -> dict:
+        return {
+            "max_concurrency": self.compare_config.get("max_concurrency", 4),
+            "callbacks": [TracingCallbackHandler(self.tracer, llm_stage="llm_compare")],
+        }
+
+    def _prepare_page_comparison(self, reference_pages, actual_pages, reference_name, actual_name):
+        """
+        Align the pages and build one chain input per window of changed page pairs.
+        Returns the local NO CHANGE rows, the windows as (pairs, owned labels) and the inputs.
+        """
+        with self.tracer.span("page_prefilter", pages=max(len(reference_pages), len(actual_pages))):
+            pairs = align_pages(reference_pages, actual_pages, self.compare_config.get("page_match_threshold", 0.5))
+        if not self.compare_config.get("prefilter", True):
+            for pair in pairs:
+                pair.changed = True
+        rows = [ChangeFormat(Page=p.label, changes="NO CHANGE").model_dump() for p in pairs if not p.changed]
+        changed = [p for p in pairs if p.changed]
+
+        window_pages = max(1, self.compare_config.get("window_pages", 10))
+        overlap = min(max(0, self.compare_config.get("window_overlap", 1)), window_pages - 1)
+        windows = []
+        for start in range(0, len(changed), window_pages - overlap):
+            window = changed[start:start + window_pages]
+            # each page is owned by the first window that contains it
+            owned = {p.label for p in window[overlap if start else 0:]}
+            windows.append((window, owned))
+            if start + window_pages >= len(changed):
+                break
+
+        inputs = [
+            {
+                "combined_docs": format_changed_pages(window, reference_pages, actual_pages, reference_name, actual_name),
+                "format_instructions": self.parser.get_format_instructions()
+            }
+            for window, _ in windows
+        ]
+        self.log.info("Page prefilter completed", total_pages=len(pairs), unchanged=len(rows), changed=len(changed), windows=len(windows))
+        return rows, windows, inputs
+
+    def _merge_page_comparison(self, rows, windows, responses) -> pd.DataFrame:
+        """
+        Merge the per-window SummaryResponse lists into one page-ordered DataFrame,
+        keeping one row per page when windows overlap.
+        """
+        seen = {row["Page"] for row in rows}
+        leftovers = []
+        for (_, owned), response in zip(windows, responses):
+            for row in response:
+                page = str(row.get("Page"))
+                if page in owned and page not in seen:
+                    rows.append(row)
+                    seen.add(page)
+                else:
+                    leftovers.append(row)
+        # rows for pages the owning window did not report
+        for row in leftovers:
+            page = str(row.get("Page"))
+            if page not in seen:
+                rows.append(row)
+                seen.add(page)
+
+        rows.sort(key=self._page_sort_key)
+        self.log.info("Page-wise document comparison completed", rows=len(rows), windows=len(windows))
+        return self._format_response(rows)
+
+    @staticmethod
+    def _page_sort_key(row: dict):
+        match = re.match(r"\s*(\d+)", str(row.get("Page", "")))
+        return (int(match.group(1)) if match else float("inf"), str(row.get("Page", "")))
+
     def _format_response(self, response_parsed: dict) -> pd.DataFrame:
         """
         Formats the response from the LLM into a DataFrame.
         """
         try:
+            import pandas as pd
+
             df = pd.DataFrame(response_parsed)
             self.log.info("Response formatted into DataFrame successfully", DataFrame=df)
             return df
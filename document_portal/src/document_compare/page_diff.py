@@ -0,0 +1,133 @@
+import re
+import hashlib
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+# the combined-documents layout written by DocumentIngestion.combine_documents
+_DOCUMENT_HEADER = re.compile(r"^Document: (.+)$", re.MULTILINE)
+_PAGE_MARKER = re.compile(r"^-- Page (\d+) -- ?\n", re.MULTILINE)
+
+
+@dataclass
+class PagePair:
+    """One aligned page of the reference (v1) and actual (v2) documents."""
+    ref_page: Optional[int]
+    act_page: Optional[int]
+    changed: bool
+    similarity: float = 1.0
+
+    @property
+    def label(self) -> str:
+        # pages are reported with the number they have in the newer document;
+        # pages that only exist in the reference keep their old number
+        if self.act_page is None:
+            return f"{self.ref_page} (deleted)"
+        return str(self.act_page)
+
+
+def normalize_page(text: str) -> str:
+    """Collapse whitespace so layout-only differences do not count as changes."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def page_hash(text: str) -> str:
+    return hashlib.sha1(normalize_page(text).encode("utf-8")).hexdigest()
+
+
+def page_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the pages' word sets, in [0, 1]."""
+    words_a, words_b = set(_WORD.findall(a.lower())), set(_WORD.findall(b.lower()))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def _align_block(ref_pages, act_pages, ref_offset, act_offset, threshold) -> List[PagePair]:
+    """
+    Pair up pages inside a changed block by maximizing total similarity
+    (Needleman-Wunsch with zero gap cost). Pages that are not similar enough to
+    anything are reported as deleted or inserted.
+    """
+    n, m = len(ref_pages), len(act_pages)
+    sim = [[page_similarity(r, a) for a in act_pages] for r in ref_pages]
+    score = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            best = max(score[i - 1][j], score[i][j - 1])
+            if sim[i - 1][j - 1] >= threshold:
+                best = max(best, score[i - 1][j - 1] + sim[i - 1][j - 1])
+            score[i][j] = best
+
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and sim[i - 1][j - 1] >= threshold and score[i][j] == score[i - 1][j - 1] + sim[i - 1][j - 1]:
+            pairs.append(PagePair(ref_offset + i, act_offset + j, True, sim[i - 1][j - 1]))
+            i, j = i - 1, j - 1
+        elif i > 0 and (j == 0 or score[i][j] == score[i - 1][j]):
+            pairs.append(PagePair(ref_offset + i, None, True, 0.0))
+            i -= 1
+        else:
+            pairs.append(PagePair(None, act_offset + j, True, 0.0))
+            j -= 1
+    return pairs[::-1]
+
+
+def align_pages(ref_pages: List[str], act_pages: List[str], threshold: float = 0.5) -> List[PagePair]:
+    """
+    Align the pages of two document versions. Identical pages are matched by hash,
+    even when pages were inserted or deleted around them; the remaining pages are
+    paired by content similarity. Page numbers in the result are 1-based.
+    """
+    ref_hashes = [page_hash(p) for p in ref_pages]
+    act_hashes = [page_hash(p) for p in act_pages]
+    matcher = SequenceMatcher(None, ref_hashes, act_hashes, autojunk=False)
+
+    pairs = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            pairs.extend(PagePair(i + 1, j + 1, False) for i, j in zip(range(i1, i2), range(j1, j2)))
+        elif tag == "delete":
+            pairs.extend(PagePair(i + 1, None, True, 0.0) for i in range(i1, i2))
+        elif tag == "insert":
+            pairs.extend(PagePair(None, j + 1, True, 0.0) for j in range(j1, j2))
+        else:
+            pairs.extend(_align_block(ref_pages[i1:i2], act_pages[j1:j2], i1, j1, threshold))
+    return pairs
+
+
+def split_combined_documents(combined_docs: str) -> List[Tuple[str, List[str]]]:
+    """
+    Undo combine_documents: (name, page texts) for each document in the combined
+    text, in order. Pages the combined text skipped as blank come back as "", so
+    list positions stay page numbers.
+    """
+    headers = list(_DOCUMENT_HEADER.finditer(combined_docs))
+    documents = []
+    for i, header in enumerate(headers):
+        body = combined_docs[header.end():headers[i + 1].start() if i + 1 < len(headers) else len(combined_docs)]
+        markers = list(_PAGE_MARKER.finditer(body))
+        pages = {}
+        for j, marker in enumerate(markers):
+            end = markers[j + 1].start() if j + 1 < len(markers) else len(body)
+            pages[int(marker.group(1))] = body[marker.end():end].strip()
+        documents.append((header.group(1).strip(), [pages.get(n, "") for n in range(1, max(pages, default=0) + 1)]))
+    return documents
+
+
+def format_changed_pages(pairs: List[PagePair], ref_pages: List[str], act_pages: List[str],
+                         ref_name: str, act_name: str) -> str:
+    """
+    Render only the changed page pairs in the combined-documents layout the
+    comparison prompt expects, labelling both sides with the same page number.
+    """
+    ref_parts, act_parts = [], []
+    for pair in pairs:
+        ref_text = ref_pages[pair.ref_page - 1] if pair.ref_page else "(page not present in this version)"
+        act_text = act_pages[pair.act_page - 1] if pair.act_page else "(page not present in this version)"
+        ref_parts.append(f"\n-- Page {pair.label} -- \n {ref_text}")
+        act_parts.append(f"\n-- Page {pair.label} -- \n {act_text}")
+    return f"Document: {ref_name}\n" + "\n".join(ref_parts) + f"\n\nDocument: {act_name}\n" + "\n".join(act_parts)
@@ -0,0 +1,117 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from utils.config_loader import load_config
+
+
+class _Scope:
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.entries = OrderedDict()  # entry id -> (question, answer, created_at)
+        self.vectors = {}             # entry id -> normalized question vector
+        self.matrix = None
+        self.matrix_ids = []
+
+
+class SemanticAnswerCache:
+    """
+    Answers cached per index, keyed by the embedding of the standalone question.
+    A lookup hits when the cosine similarity to a cached question reaches the
+    threshold. Entries expire after ttl_seconds and are evicted least recently used
+    beyond max_entries per index. A scope is dropped as soon as its index
+    fingerprint changes, so answers never outlive the corpus they came from.
+    """
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._scopes = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _scope(self, scope_key: str, fingerprint) -> _Scope:
+        scope = self._scopes.get(scope_key)
+        if scope is None or scope.fingerprint != fingerprint:
+            scope = self._scopes[scope_key] = _Scope(fingerprint)
+        return scope
+
+    def _expire(self, scope: _Scope) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [i for i, (_, _, created) in scope.entries.items() if created < cutoff]
+        for entry_id in expired:
+            del scope.entries[entry_id]
+            del scope.vectors[entry_id]
+        if expired:
+            scope.matrix = None
+
+    def lookup(self, scope_key: str, fingerprint, vector: List[float]) -> Optional[dict]:
+        """
+        Return {"question", "answer", "similarity"} for the closest cached question,
+        or None if nothing is similar enough.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            scope = self._scope(scope_key, fingerprint)
+            self._expire(scope)
+            if not scope.entries:
+                return None
+            if scope.matrix is None:
+                scope.matrix_ids = list(scope.vectors)
+                scope.matrix = np.vstack([scope.vectors[i] for i in scope.matrix_ids])
+
+            similarities = scope.matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            entry_id = scope.matrix_ids[best]
+            scope.entries.move_to_end(entry_id)
+            question, answer, _ = scope.entries[entry_id]
+            return {"question": question, "answer": answer, "similarity": float(similarities[best])}
+
+    def store(self, scope_key: str, fingerprint, question: str, vector: List[float], answer: str) -> None:
+        with self._lock:
+            scope = self._scope(scope_key, fingerprint)
+            entry_id = self._next_id
+            self._next_id += 1
+            scope.entries[entry_id] = (question, answer, time.monotonic())
+            scope.vectors[entry_id] = self._normalize(vector)
+            while len(scope.entries) > self.max_entries:
+                evicted, _ = scope.entries.popitem(last=False)
+                del scope.vectors[evicted]
+            scope.matrix = None
+
+    def invalidate(self, scope_key: Optional[str] = None) -> None:
+        """Drop the cached answers of one index, or of all indexes."""
+        with self._lock:
+            if scope_key is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope_key, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Process-wide answer cache from the answer_cache block in config.yaml, or None if disabled."""
+    global _cache
+    cache_config = load_config().get("answer_cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache(
+                similarity_threshold=cache_config.get("similarity_threshold", 0.95),
+                max_entries=cache_config.get("max_entries", 512),
+                ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            )
+        return _cache
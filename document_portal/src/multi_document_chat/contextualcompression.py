@@ -0,0 +1,116 @@
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from utils.config_loader import load_config
+from utils.token_counter import count_tokens
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_NON_WORD = re.compile(r"\W+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text).strip().lower()
+
+
+class ContextCompressor:
+    """
+    Shrinks retrieved chunks before they reach the QA prompt, without LLM calls.
+    Sentences repeated across overlapping chunks (or cut off at a chunk boundary)
+    are dropped, the rest are scored by embedding similarity to the question, and
+    the most relevant ones are kept up to max_tokens, skipping near-duplicates.
+    Kept sentences stay in their original order within each chunk.
+    """
+    def __init__(self, embeddings, max_tokens: int = 1500, similarity_threshold: float = 0.3,
+                 redundancy_threshold: float = 0.92, min_sentences: int = 3):
+        self.embeddings = embeddings
+        self.max_tokens = max_tokens
+        self.similarity_threshold = similarity_threshold
+        self.redundancy_threshold = redundancy_threshold
+        self.min_sentences = min_sentences
+
+    def _unique_sentences(self, docs: List[Document]) -> List[Tuple[int, int, str]]:
+        """(doc position, sentence position, sentence) for sentences not contained in a longer one."""
+        candidates = []
+        for d, doc in enumerate(docs):
+            for s, sentence in enumerate(split_sentences(doc.page_content)):
+                candidates.append((d, s, sentence, _normalize(sentence)))
+
+        kept, seen = [], []
+        # longest first, so a fragment from a chunk boundary finds the full sentence it belongs to
+        for d, s, sentence, normalized in sorted(candidates, key=lambda c: len(c[3]), reverse=True):
+            if not normalized or any(normalized in other for other in seen):
+                continue
+            seen.append(normalized)
+            kept.append((d, s, sentence))
+        return kept
+
+    def compress(self, question: str, docs: List[Document], max_tokens: Optional[int] = None) -> Tuple[List[Document], dict]:
+        """
+        Return the compressed documents and a report of how much context was removed.
+        max_tokens, if given, replaces the compressor's own budget for this call.
+        """
+        input_tokens = sum(count_tokens(doc.page_content) for doc in docs)
+        sentences = self._unique_sentences(docs)
+        total_sentences = sum(len(split_sentences(doc.page_content)) for doc in docs)
+        report = {"input_tokens": input_tokens, "sentences": total_sentences,
+                  "duplicate_sentences": total_sentences - len(sentences), "kept_sentences": 0}
+        if not sentences:
+            return list(docs), {**report, "output_tokens": input_tokens, "removed_tokens": 0, "removed_ratio": 0.0}
+
+        vectors = np.asarray(self.embeddings.embed_documents([s for _, _, s in sentences]), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+        selected, budget = [], self.max_tokens if max_tokens is None else max_tokens
+        for i in np.argsort(-relevance):
+            if relevance[i] < self.similarity_threshold and len(selected) >= self.min_sentences:
+                break
+            if selected and similarity[i, selected].max() >= self.redundancy_threshold:
+                report["duplicate_sentences"] += 1
+                continue
+            tokens = count_tokens(sentences[i][2])
+            if tokens > budget:
+                continue
+            budget -= tokens
+            selected.append(int(i))
+
+        kept_by_doc = {}
+        for i in sorted(selected, key=lambda i: sentences[i][:2]):
+            d, _, sentence = sentences[i]
+            kept_by_doc.setdefault(d, []).append(sentence)
+        compressed = [
+            Document(page_content=" ".join(kept_by_doc[d]), metadata=dict(docs[d].metadata))
+            for d in range(len(docs)) if d in kept_by_doc
+        ]
+        output_tokens = sum(count_tokens(doc.page_content) for doc in compressed)
+        report.update(
+            kept_sentences=len(selected),
+            output_tokens=output_tokens,
+            removed_tokens=input_tokens - output_tokens,
+            removed_ratio=round(1 - output_tokens / input_tokens, 4) if input_tokens else 0.0,
+        )
+        return compressed, report
+
+
+def get_context_compressor(embeddings) -> Optional[ContextCompressor]:
+    """
+    Compressor from the context_compression block in config.yaml, or None if disabled.
+    It has no token budget of its own there: callers pass the context packer's.
+    """
+    compression_config = load_config().get("context_compression", {})
+    if not compression_config.get("enabled", False):
+        return None
+    return ContextCompressor(
+        embeddings,
+        similarity_threshold=compression_config.get("similarity_threshold", 0.3),
+        redundancy_threshold=compression_config.get("redundancy_threshold", 0.92),
+        min_sentences=compression_config.get("min_sentences", 3),
+    )
@@ -1,21 +1,58 @@
 import sys
 
-from requests import session
 from exception.custom_exception import DocumentPortalException
-from tokenize import Single
+import os
 import uuid
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
+from concurrent.futures import ProcessPoolExecutor
+from utils.chunking import get_text_splitter
 from logger.custom_logger import CustomLogger
 from utils.model_loader import Model_Loader
+from utils.file_io import read_upload, write_buffer, write_buffer_async, load_documents_from_bytes
+from utils.tracing import get_tracer
+from utils.faiss_store import index_exists, index_lock, load_vectorstore, save_vectorstore, build_vectorstore, add_embeddings, upgrade_index
+from utils.retriever_factory import build_retriever, hybrid_enabled, load_lexical_index
+from utils.bm25 import BM25Index
 from datetime import datetime, timezone
 
 
+def _load_file(file_name: str, ext: str, file_path: str|None = None, data: bytes|None = None) -> list:
+    """
+    Parse one upload into documents, either from its saved path or from its bytes.
+    file_path is the upload's unique path in both cases and becomes the documents'
+    source, so uploads with the same file name are not merged. Runs inside the
+    parsing process pool, so it is a module-level function and returns picklable
+    documents.
+    """
+    if data is not None:
+        docs = load_documents_from_bytes(data, ext, file_name, source=file_path)
+        for doc in docs:
+            doc.metadata["file_name"] = file_name
+        return docs
+
+    # loaders pull in their parser libraries, so import only the one this file needs
+    if ext == ".pdf":
+        from langchain_community.document_loaders import PyPDFLoader
+        loader = PyPDFLoader(file_path)
+    elif ext == ".docx":
+        from langchain_community.document_loaders import Docx2txtLoader
+        loader = Docx2txtLoader(file_path)
+    elif ext in (".txt", ".md"):
+        from langchain_community.document_loaders import TextLoader
+        loader = TextLoader(file_path, encoding = "utf-8")
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+    docs = loader.load()
+    for doc in docs:
+        doc.metadata["file_name"] = file_name
+    return docs
+
+
 class DocumentIngestor:
     SUPPORTED_FILE_EXTN = {'.pdf','.docx','.txt','.md'}
-    def __init__(self, temp_dir: str = "data/multi_doc_chat", faiss_dir: str = "faiss_index", session_id: str|None = None):
+    def __init__(self, temp_dir: str = "data/multi_doc_chat", faiss_dir: str = "faiss_index", session_id: str|None = None, parse_workers: int|None = None,
+                 in_memory: bool|None = None, persist_uploads: bool|None = None):
         try:
             self.log = CustomLogger().get_logger(__name__)
             
@@ -33,8 +70,17 @@ class DocumentIngestor:
             self.session_faiss_dir.mkdir(parents=True, exist_ok=True)
 
             self.model_loader = Model_Loader()
+            self.tracer = get_tracer()
+            ingestion_config = self.model_loader.config.get("ingestion", {})
+            self.parse_workers = parse_workers or ingestion_config.get("parse_workers") or os.cpu_count() or 1
+            # in_memory parses straight from upload buffers; persisting then happens in the background
+            self.in_memory = ingestion_config.get("in_memory", False) if in_memory is None else in_memory
+            self.persist_uploads = ingestion_config.get("persist_uploads", True) if persist_uploads is None else persist_uploads
+            self.failed_files = []
             self.log.info(
                 "Document Ingestor Initialized",
+                parse_workers = self.parse_workers,
+                in_memory = self.in_memory,
                 temp_base = str(self.temp_dir),
                 faiss_base = str(self.faiss_dir),
                 session_id = self.session_id,
@@ -46,60 +92,123 @@ class DocumentIngestor:
             self.log.error("Failed to initialize DocumentIngestor", error=str(e))
             raise DocumentPortalException("Initialization error in DocumentIngestor", sys)
     
-    def ingest_files(self, uploaded_files):
+    def ingest_files(self, uploaded_files, incremental: bool = False):
+        """
+        Load uploaded files and build the session retriever.
+        With incremental=True the files are appended to the existing session index
+        instead of rebuilding it, so only the new files are split and embedded.
+        """
         try:
-            documents = []
+            self.failed_files = []
+            pending_files = []
             
             for uploaded_file in uploaded_files:
                 ext = Path(uploaded_file.name).suffix.lower()
                 if ext not in self.SUPPORTED_FILE_EXTN:
                     self.log.warning("Unsupported file skipped",filename=uploaded_file.name)
+                    self.failed_files.append({"filename": uploaded_file.name, "error": f"Unsupported file type: {ext}"})
                     continue
                 
                 unique_filename = f"{uuid.uuid4().hex[:8]}.{ext}"
                 temp_path = self.session_temp_dir / unique_filename
+                data = read_upload(uploaded_file)
                 
-                with open(temp_path, "wb") as f_out:
-                    f_out.write(uploaded_file.read())
-                self.log.info("FIle saved for ingestion", filename = uploaded_file.name, saved_as = str(temp_path), session_id = self.session_id)
-                
-                if ext == ".pdf":
-                    loader = PyPDFLoader(str(temp_path))
-                elif ext == ".docx":
-                    loader = Docx2txtLoader(str(temp_path))
-                elif ext == ".txt":
-                    loader = TextLoader(str(temp_path), encoding = "utf-8")
-                else:
-                    self.log.warning("Unsupported file type encountered", filename = uploaded_file.name)
+                if self.in_memory:
+                    if self.persist_uploads:
+                        write_buffer_async(data, temp_path)
+                    pending_files.append((uploaded_file.name, ext, str(temp_path), data))
                     continue
                 
+                write_buffer(data, temp_path)
+                self.log.info("FIle saved for ingestion", filename = uploaded_file.name, saved_as = str(temp_path), session_id = self.session_id)
+                pending_files.append((uploaded_file.name, ext, str(temp_path), None))
                 
-                docs = loader.load()
-                documents.extend(docs)
+            with self.tracer.span("parse", session_id=self.session_id, files=len(pending_files)) as span:
+                documents = self._parse_files(pending_files)
+                span["documents"] = len(documents)
                 
             if not documents:
                 raise DocumentPortalException("No valid documents loaded", sys)
             
             self.log.info("All documents loaded", total_docs=len(documents),session_id = self.session_id) 
-            return self._create_retriever(documents)
+            return self._create_retriever(documents, incremental=incremental)
                 
         except Exception as e:
             self.log.error("Failed to ingest file for multi doc chat", error = str(e))
             raise DocumentPortalException("File ingestion error in DocumentIngestor", sys)
     
-    def _create_retriever(self, documents):
+    def _parse_files(self, pending_files) -> list:
+        """
+        Parse uploads in a process pool, keeping the upload order.
+        A file that fails to parse is recorded in self.failed_files and skipped.
+        """
+        workers = min(self.parse_workers, len(pending_files))
+        if workers <= 1:
+            outcomes = []
+            for args in pending_files:
+                try:
+                    outcomes.append(_load_file(*args))
+                except Exception as e:
+                    outcomes.append(e)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_load_file, *args) for args in pending_files]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as e:
+                        outcomes.append(e)
+
+        documents = []
+        failed = 0
+        for (file_name, *_), outcome in zip(pending_files, outcomes):
+            if isinstance(outcome, Exception):
+                failed += 1
+                self.log.warning("File could not be parsed", filename=file_name, error=str(outcome), session_id=self.session_id)
+                self.failed_files.append({"filename": file_name, "error": str(outcome)})
+                continue
+            documents.extend(outcome)
+        self.log.info("Files parsed", parsed=len(pending_files) - failed, failed=failed, workers=workers)
+        return documents
+
+    def _create_retriever(self, documents, incremental: bool = False):
         try:
-            #can use different splitter, the option can be given in UI too
-            splitter = RecursiveCharacterTextSplitter(chunk_size = 1000, chunk_overlap = 300)
-            texts = splitter.split_documents(documents)
+            # strategy and sizes come from the chunking block in config.yaml
+            with self.tracer.span("split", session_id=self.session_id, documents=len(documents)) as span:
+                splitter = get_text_splitter()
+                texts = splitter.split_documents(documents)
+                span["chunks"] = len(texts)
             self.log.info("Documents split into text", count=len(texts)) 
             
             embeddings = self.model_loader.load_embeddings()
-            vectorstore = FAISS.from_documents(documents=texts, embedding=embeddings)
-            vectorstore.save_local(str(self.session_faiss_dir))
-            self.log.info("FAISS index created and saved", faiss_path=str(self.session_faiss_dir))
+            # embed outside the lock; only load/append/save of the session index is serialized
+            with self.tracer.span("embed", session_id=self.session_id, chunks=len(texts)):
+                text_embeddings = list(zip([t.page_content for t in texts], embeddings.embed_documents([t.page_content for t in texts])))
+            metadatas = [t.metadata for t in texts]
+            hybrid = hybrid_enabled()
+            lexical_index = None
+            with self.tracer.span("faiss_build", session_id=self.session_id, chunks=len(texts), incremental=incremental), index_lock(self.session_faiss_dir):
+                if incremental and index_exists(self.session_faiss_dir):
+                    vectorstore = load_vectorstore(self.session_faiss_dir, embeddings)
+                    if hybrid:
+                        lexical_index = load_lexical_index(vectorstore, self.session_faiss_dir)
+                    add_embeddings(vectorstore, text_embeddings, metadatas)
+                    upgrade_index(vectorstore)
+                    self.log.info("Chunks appended to existing FAISS index", added=len(texts), total=vectorstore.index.ntotal, session_id=self.session_id)
+                else:
+                    vectorstore = build_vectorstore(text_embeddings, embeddings, metadatas=metadatas)
+                    if hybrid:
+                        lexical_index = BM25Index()
+                if lexical_index is not None:
+                    # numbered in the same order as the vectors, so BM25 ids are FAISS ids
+                    with self.tracer.span("bm25_build", session_id=self.session_id, chunks=len(texts)):
+                        lexical_index.add(t.page_content for t in texts)
+                save_vectorstore(vectorstore, self.session_faiss_dir,
+                                 sidecars={BM25Index.FILE_NAME: lexical_index} if lexical_index is not None else None)
+            self.log.info("FAISS index created and saved", faiss_path=str(self.session_faiss_dir), hybrid=hybrid)
             
-            retriever = vectorstore.as_retriever(search_type = "similarity",search_kwargs ={"k":5})
+            retriever = build_retriever(vectorstore, lexical_index=lexical_index)
             self.log.info("FAISS Retriver created and ready to use",session_id = self.session_id)
             return retriever
         except Exception as e:
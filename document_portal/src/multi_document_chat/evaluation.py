@@ -0,0 +1,80 @@
+"""
+Offline benchmark and evaluation of multi-document chat.
+
+Ingests the data/multi_doc_chat fixtures and synthetic corpora with the fake
+models and measures ingest throughput, index build time, retrieval and answer
+latency, recall@k on labeled questions and peak RSS.
+
+Usage (from the project root):
+    python -m src.multi_document_chat.evaluation [--scales 50 500] [--update-baseline]
+
+Exits with status 1 if any metric regressed against the stored baseline.
+"""
+import sys
+import time
+from pathlib import Path
+from utils.config_loader import load_config
+from utils.tracing import get_tracer
+from utils.evaluation import (
+    PROJECT_ROOT, fixture_uploads, load_questions, measure_queries, peak_rss_mb,
+    percentiles_ms, recall_hit, run_suite, stage_delta,
+)
+
+SUITE = "multi_document_chat"
+
+
+def load_fixtures():
+    fixture_dir = PROJECT_ROOT / "data" / "multi_doc_chat"
+    return fixture_uploads(sorted(fixture_dir.iterdir())), load_questions("multi_doc_chat")
+
+
+def run_corpus(name: str, uploads: list, questions: list, workdir: Path) -> dict:
+    from src.multi_document_chat.data_ingestion import DocumentIngestor
+    from src.multi_document_chat.retrieval import ConversationalRag
+
+    eval_config = load_config().get("evaluation", {})
+    top_k = load_config().get("retriever", {}).get("top_k", 10)
+    tracer = get_tracer()
+    tracer.enabled = True
+
+    before = tracer.snapshot()
+    start = time.perf_counter()
+    ingestor = DocumentIngestor(temp_dir=str(workdir / "uploads"), faiss_dir=str(workdir / "faiss_index"),
+                                session_id=name, persist_uploads=False)
+    retriever = ingestor.ingest_files(uploads)
+    ingest_s = time.perf_counter() - start
+    after = tracer.snapshot()
+
+    pages = stage_delta(before, after, "parse", "documents")
+    chunks = stage_delta(before, after, "split", "chunks")
+    retrieval_ms, retrieved = measure_queries(retriever.invoke, questions, repeats=eval_config.get("repeats", 5))
+    hits = sum(recall_hit(docs[:top_k], q["expected"]) for docs, q in zip(retrieved, questions))
+
+    # one pass through the whole chat pipeline (routing, compression, answer) with the echo model
+    rag = ConversationalRag(session_id=name, retriever=retriever)
+    answer_ms, _ = measure_queries(lambda question: rag.invoke(question, []), questions)
+
+    return {
+        "files": len(uploads),
+        "pages": int(pages),
+        "chunks": int(chunks),
+        "questions": len(questions),
+        "ingest_s": round(ingest_s, 3),
+        "pages_per_s": round(pages / ingest_s, 2),
+        "chunks_per_s": round(chunks / ingest_s, 2),
+        "index_build_s": round(stage_delta(before, after, "faiss_build"), 4),
+        "embed_s": round(stage_delta(before, after, "embed"), 4),
+        **percentiles_ms(retrieval_ms, "retrieval"),
+        **percentiles_ms(answer_ms, "answer"),
+        "recall_at_k": round(hits / len(questions), 4) if questions else None,
+        "k": top_k,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    return run_suite(SUITE, run_corpus, {"fixtures": load_fixtures}, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,24 @@
 import sys
 import os
-from operator import itemgetter
-from typing import List, Optional
+import time
+import asyncio
+from typing import AsyncIterator, Iterator, List, Optional
 from langchain_core.messages import BaseMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.vectorstores import FAISS
 from utils.model_loader import Model_Loader
 from exception.custom_exception import DocumentPortalException
 from logger.custom_logger import CustomLogger
 from prompt.prompt_library import PROMPT_REGISTRY
 from models.model import PromptType
+from utils.tracing import get_tracer, usage_attrs
+from src.multi_document_chat.answer_cache import get_answer_cache
+from src.multi_document_chat.contextualcompression import get_context_compressor
+from utils.context_packer import get_context_packer
+from utils.query_router import QueryRouter, same_question
+from utils.session_index import get_session_index_manager
+from utils.chat_history import history_budget, trim_messages
+from utils.retriever_factory import build_retriever
 
 
 class ConversationalRag:
@@ -19,12 +26,20 @@ class ConversationalRag:
         try:
             self.log =  CustomLogger().get_logger(__name__)
             self.session_id = session_id
+            self.tracer = get_tracer()
+            self.parser = StrOutputParser()
+            self.answer_cache = get_answer_cache()
+            self.index_path = None
+            self._embeddings = None
+            self.compressor = None
             self.llm =  self._load_llm()
+            self.packer = get_context_packer(Model_Loader().llm_settings().get("context_tokens"))
             self.contextualize_prompt: ChatPromptTemplate = PROMPT_REGISTRY[PromptType.CONTEXTUALIZE_QUESTION.value]
             self.qa_prompt: ChatPromptTemplate = PROMPT_REGISTRY[PromptType.CONTEXT_QA.value]
             if retriever is None:
                 raise ValueError("Retriever cannot be None")
             self.retriever = retriever
+            self.router = QueryRouter(rewrite=self._rewrite_question, retrieve=self._retrieve)
             self._build_lcel_chain()
             self.log.info("ConversationalRAG initialized", session_id=self.session_id)
             
@@ -36,18 +51,17 @@ class ConversationalRag:
     def load_retiever_from_faiss(self,index_path: str):
         """
         Load a FAISS vectorstore from disk and convert to retriever.
+        The index is opened memory-mapped through the session index manager and
+        shared with other requests for the same session.
         """
         
         try:
             embeddings = Model_Loader().load_embeddings()
             if not os.path.isdir(index_path):
                 raise FileNotFoundError(f"FAISS index directory not found: {index_path}")
-            vectorstore = FAISS.load_local(
-                index_path,
-                embeddings,
-                allow_dangerous_deserialization=True,  # only if you trust the index
-            )
-            self.retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+            session_index = get_session_index_manager().get(self.session_id, index_path, embeddings)
+            self.retriever = session_index.derive("retriever", lambda vs: build_retriever(vs, index_dir=index_path))
+            self.index_path = index_path
             self.log.info("FAISS retriever loaded successfully", index_path=index_path, session_id=self.session_id)
             self._build_lcel_chain()
             return self.retriever
@@ -58,28 +72,220 @@ class ConversationalRag:
 
     def invoke(self,user_input:str,chat_history: Optional[List[BaseMessage]] = None) ->str:
         """
+        Answer a question against the session index. The question rewrite, retrieval
+        and answer run as separate traced stages; the rewrite only runs when the
+        question depends on the chat history, which is trimmed to its newest turns
+        within the chat_history token budget.
         Args:
             user_input (str): _description_
             chat_history (Optional[List[BaseMessage]], optional): _description_. Defaults to None.
         """
         try:
-            chat_history = chat_history or []
-            payload={"input": user_input, "chat_history": chat_history}
-            answer = self.chain.invoke(payload)
-            if not answer:
-                self.log.warning("No answer generated", user_input=user_input, session_id=self.session_id)
-                return "no answer generated."
-            
-            self.log.info("Chain invoked successfully",
-                session_id=self.session_id,
-                user_input=user_input,
-                answer_preview=answer[:150],
-            )
-            return answer
+            chat_history = self._window(chat_history)
+            with self.tracer.span("rag_invoke", session_id=self.session_id) as span:
+                docs, cached_answer, cache_entry = self._prepare(user_input, chat_history, span)
+                if cached_answer is not None:
+                    return cached_answer
+                answer = self._answer(user_input, chat_history, docs)
+                self._store_answer(cache_entry, answer)
+            return self._finish(user_input, answer)
         except Exception as e:
             self.log.error("Failed to invoke ConversationalRAG", error=str(e))
             raise DocumentPortalException("Invocation error in ConversationalRAG", sys)
 
+    def stream(self, user_input: str, chat_history: Optional[List[BaseMessage]] = None) -> Iterator[str]:
+        """
+        Same as invoke(), but yields the answer tokens as the LLM produces them.
+        Caching and logging happen once the stream has finished; the time to the
+        first token is recorded as the "ttft" stage.
+        """
+        try:
+            chat_history = self._window(chat_history)
+            start = time.perf_counter()
+            with self.tracer.span("rag_stream", session_id=self.session_id) as span:
+                docs, cached_answer, cache_entry = self._prepare(user_input, chat_history, span)
+                if cached_answer is not None:
+                    self._record_ttft(start, cached=True)
+                    yield cached_answer
+                    return
+
+                parts, message = [], None
+                with self.tracer.span("llm_answer", session_id=self.session_id, streaming=True) as answer_span:
+                    for chunk in self.answer_chain.stream(self._answer_inputs(user_input, chat_history, docs)):
+                        message = chunk if message is None else message + chunk
+                        token = self.parser.invoke(chunk)
+                        if not token:
+                            continue
+                        if not parts:
+                            span["ttft_ms"] = self._record_ttft(start)
+                        parts.append(token)
+                        yield token
+                    answer_span.update(usage_attrs(message))
+                answer = "".join(parts)
+                self._store_answer(cache_entry, answer)
+            answer = self._finish(user_input, answer)
+            if not parts:
+                yield answer
+        except Exception as e:
+            self.log.error("Failed to stream ConversationalRAG", error=str(e))
+            raise DocumentPortalException("Streaming error in ConversationalRAG", sys)
+
+    async def astream(self, user_input: str, chat_history: Optional[List[BaseMessage]] = None) -> AsyncIterator[str]:
+        """Async variant of stream(). Routing and retrieval run in a worker thread."""
+        try:
+            chat_history = self._window(chat_history)
+            start = time.perf_counter()
+            with self.tracer.span("rag_stream", session_id=self.session_id) as span:
+                docs, cached_answer, cache_entry = await asyncio.to_thread(self._prepare, user_input, chat_history, span)
+                if cached_answer is not None:
+                    self._record_ttft(start, cached=True)
+                    yield cached_answer
+                    return
+
+                parts, message = [], None
+                with self.tracer.span("llm_answer", session_id=self.session_id, streaming=True) as answer_span:
+                    async for chunk in self.answer_chain.astream(self._answer_inputs(user_input, chat_history, docs)):
+                        message = chunk if message is None else message + chunk
+                        token = self.parser.invoke(chunk)
+                        if not token:
+                            continue
+                        if not parts:
+                            span["ttft_ms"] = self._record_ttft(start)
+                        parts.append(token)
+                        yield token
+                    answer_span.update(usage_attrs(message))
+                answer = "".join(parts)
+                self._store_answer(cache_entry, answer)
+            answer = self._finish(user_input, answer)
+            if not parts:
+                yield answer
+        except Exception as e:
+            self.log.error("Failed to stream ConversationalRAG", error=str(e))
+            raise DocumentPortalException("Streaming error in ConversationalRAG", sys)
+
+    def _prepare(self, user_input: str, chat_history: List[BaseMessage], span: dict):
+        """
+        Route the question and retrieve its documents, or serve it from the answer
+        cache, keyed by the standalone question. Returns (docs, cached_answer, cache_entry);
+        cache_entry is what _store_answer needs to cache the answer once it is generated.
+        """
+        # the rewrite is skipped for standalone questions; otherwise retrieval for
+        # the raw question runs speculatively alongside it
+        question, pending_docs, span["route"] = self.router.resolve(user_input, chat_history)
+
+        cache_entry = None
+        # the answer prompt also sees the chat history, so a follow-up only shares answers
+        # with other conversations once it stands on its own: rewritten, or found standalone
+        # without a rewrite. One the rewrite kept unchanged may still lean on the history.
+        standalone = not chat_history or span["route"] == "skipped" or not same_question(question, user_input)
+        if self.answer_cache is not None and not standalone:
+            span["cache_hit"] = None
+        elif self.answer_cache is not None:
+            scope, fingerprint = self._answer_cache_scope()
+            question_vector = self._embed_question(question)
+            hit = self.answer_cache.lookup(scope, fingerprint, question_vector)
+            span["cache_hit"] = hit is not None
+            if hit is not None:
+                self.log.info("Answer served from cache", session_id=self.session_id, user_input=user_input,
+                              question=question, cached_question=hit["question"], similarity=round(hit["similarity"], 4))
+                return None, hit["answer"], None
+            cache_entry = (scope, fingerprint, question, question_vector)
+
+        docs = pending_docs.result() if pending_docs is not None else self._retrieve(question)
+        return self._compress(question, docs), None, cache_entry
+
+    def _store_answer(self, cache_entry, answer: str) -> None:
+        if answer and cache_entry is not None:
+            scope, fingerprint, question, question_vector = cache_entry
+            self.answer_cache.store(scope, fingerprint, question, question_vector, answer)
+
+    def _finish(self, user_input: str, answer: str) -> str:
+        if not answer:
+            self.log.warning("No answer generated", user_input=user_input, session_id=self.session_id)
+            return "no answer generated."
+
+        self.log.info("Chain invoked successfully",
+            session_id=self.session_id,
+            user_input=user_input,
+            answer_preview=answer[:150],
+        )
+        return answer
+
+    @staticmethod
+    def _window(chat_history: Optional[List[BaseMessage]]) -> List[BaseMessage]:
+        # the caller's history is trimmed to the newest turns within the chat_history budget
+        return trim_messages(chat_history or [], history_budget())
+
+    def _record_ttft(self, start: float, cached: bool = False) -> float:
+        ttft_ms = (time.perf_counter() - start) * 1000
+        self.tracer.record("ttft", ttft_ms, session_id=self.session_id, cached=cached)
+        return round(ttft_ms, 3)
+
+    def _rewrite_question(self, user_input: str, chat_history: List[BaseMessage]) -> str:
+        with self.tracer.span("question_rewrite", session_id=self.session_id) as span:
+            message = self.question_rewriter.invoke({"input": user_input, "chat_history": chat_history})
+            span.update(usage_attrs(message))
+            return self.parser.invoke(message)
+
+    def _get_embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = Model_Loader().load_embeddings()
+        return self._embeddings
+
+    def _embed_question(self, question: str):
+        embeddings = self._get_embeddings()
+        with self.tracer.span("question_embed", session_id=self.session_id):
+            return embeddings.embed_query(question)
+
+    def _answer_cache_scope(self):
+        """
+        Cache scope and fingerprint of the index behind the retriever. The fingerprint
+        changes whenever the index changes, which drops that index's cached answers.
+        """
+        if self.index_path:
+            stat = os.stat(os.path.join(self.index_path, "index.faiss"))
+            return os.path.abspath(self.index_path), (stat.st_mtime_ns, stat.st_size)
+        vectorstore = getattr(self.retriever, "vectorstore", None)
+        ntotal = getattr(getattr(vectorstore, "index", None), "ntotal", None)
+        return self.session_id, (id(self.retriever), ntotal)
+
+    def _retrieve(self, question: str):
+        with self.tracer.span("retrieval", session_id=self.session_id) as span:
+            docs = self.retriever.invoke(question)
+            span["documents"] = len(docs)
+            return docs
+
+    def _compress(self, question: str, docs):
+        """
+        Drop irrelevant and duplicated sentences from the retrieved chunks, if enabled.
+        Compression runs before packing and owns the context budget: it keeps sentences
+        within the packer's budget (the model's context_tokens) less the block headers,
+        so packing then only labels and merges. Without compression the packer cuts
+        whole chunks to the same budget.
+        """
+        if self.compressor is None:
+            self.compressor = get_context_compressor(self._get_embeddings())
+        if self.compressor is None or not docs:
+            return docs
+        with self.tracer.span("context_compression", session_id=self.session_id, documents=len(docs)) as span:
+            compressed, report = self.compressor.compress(question, docs, max_tokens=self.packer.text_budget(docs))
+            span.update(report)
+        self.log.info("Retrieved context compressed", session_id=self.session_id, **report)
+        return compressed
+
+    def _answer(self, user_input: str, chat_history: List[BaseMessage], docs) -> str:
+        with self.tracer.span("llm_answer", session_id=self.session_id) as span:
+            message = self.answer_chain.invoke(self._answer_inputs(user_input, chat_history, docs))
+            span.update(usage_attrs(message))
+            return self.parser.invoke(message)
+
+    def _answer_inputs(self, user_input: str, chat_history: List[BaseMessage], docs) -> dict:
+        return {
+            "context": self._pack_context(docs),
+            "input": user_input,
+            "chat_history": chat_history,
+        }
+
     def _load_llm(self):
         try:
             llm = Model_Loader().load_llm()
@@ -91,39 +297,22 @@ class ConversationalRag:
             self.log.error("Failed to load LLM", error=str(e))
             raise DocumentPortalException("LLM loading error in ConversationalRAG", sys)
     
-    @staticmethod
-    def _format_docs(docs):
-        return "\n\n".join(d.page_content for d in docs)
+    def _pack_context(self, docs) -> str:
+        """Merge overlapping chunks into source-tagged blocks within the model's context budget."""
+        with self.tracer.span("context_pack", session_id=self.session_id) as span:
+            context, report = self.packer.pack(docs)
+            span.update(report)
+        self.log.info("Retrieved context packed", session_id=self.session_id, **report)
+        return context
     
     def _build_lcel_chain(self):
         try:
-            # 1) Rewrite question using chat history
-            question_rewriter = (
-                {"input": itemgetter("input"), "chat_history": itemgetter("chat_history")}
-                | self.contextualize_prompt
-                | self.llm
-                | StrOutputParser()
-            )
-
-            # 2) Retrieve docs for rewritten question
-            retrieve_docs = question_rewriter | self.retriever | self._format_docs
-
-            # 3) Feed context + original input + chat history into answer prompt
-            self.chain = (
-                {
-                    "context": retrieve_docs,
-                    "input": itemgetter("input"),
-                    "chat_history": itemgetter("chat_history"),
-                }
-                | self.qa_prompt
-                | self.llm
-                | StrOutputParser()
-            )
-
-            self.log.info("LCEL graph built successfully", session_id=self.session_id)
+            # Stage runnables, invoked one by one from invoke()/stream()/astream() so each
+            # stage (rewrite, retrieval, compression, packing, answer) is traced on its own
+            self.question_rewriter = self.contextualize_prompt | self.llm
+            self.answer_chain = self.qa_prompt | self.llm
+            self.log.info("LCEL stages built successfully", session_id=self.session_id)
 
         except Exception as e:
             self.log.error("Failed to build LCEL chain", error=str(e), session_id=self.session_id)
             raise DocumentPortalException("Failed to build LCEL chain", sys)
-
-    
\ No newline at end of file
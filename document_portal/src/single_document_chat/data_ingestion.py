@@ -1,17 +1,20 @@
-from tokenize import Single
 import uuid
 from pathlib import Path
 import sys
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
+from utils.chunking import get_text_splitter
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from utils.model_loader import Model_Loader
+from utils.tracing import get_tracer
+from utils.file_io import read_upload, write_buffer, write_buffer_async, load_documents_from_bytes
+from utils.faiss_store import save_vectorstore, build_vectorstore
+from utils.retriever_factory import build_retriever, hybrid_enabled
+from utils.bm25 import BM25Index
 from datetime import datetime, timezone
 
 class SingleDocIngestor:
-    def __init__(self, data_dir: str = "data/single_doc_chat", faiss_dir: str = "faiss_index"):
+    def __init__(self, data_dir: str = "data/single_doc_chat", faiss_dir: str = "faiss_index",
+                 in_memory: bool|None = None, persist_uploads: bool|None = None, session_id: str|None = None):
         try:
             self.log = CustomLogger().get_logger(__name__)
             self.data_dir = Path(data_dir)
@@ -19,46 +22,77 @@ class SingleDocIngestor:
             
             self.faiss_dir = Path(faiss_dir)
             self.faiss_dir.mkdir(parents=True, exist_ok=True)
+            # each ingest gets its own index directory; the base directory also holds the multi-doc sessions
+            self.session_id = session_id or f"session_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            self.session_faiss_dir = self.faiss_dir / self.session_id
             
             self.model_loader = Model_Loader()
-            self.log.info("SingleDocIngestor is initialized", temp_path=str(self.data_dir), faiss_path = str(self.faiss_dir))
+            self.tracer = get_tracer()
+            ingestion_config = self.model_loader.config.get("ingestion", {})
+            self.in_memory = ingestion_config.get("in_memory", False) if in_memory is None else in_memory
+            self.persist_uploads = ingestion_config.get("persist_uploads", True) if persist_uploads is None else persist_uploads
+            self.log.info("SingleDocIngestor is initialized", temp_path=str(self.data_dir), faiss_path = str(self.session_faiss_dir), in_memory=self.in_memory)
         except Exception as e:
             self.log.error("Error initializing SingleDocIngestor", error=str(e))
             raise DocumentPortalException("Error initializing SingleDocIngestor", sys)
     
     def ingest_files(self, uploaded_files):
         try:
-            documents = []
-            
-            for uploaded_file in uploaded_files:
-                unique_filename = f"session_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.pdf"
-                temp_path = self.data_dir / unique_filename
-                
-                with open(temp_path, "wb") as f_out:
-                    f_out.write(uploaded_file.read())
-                self.log.info("Pdf saved for ingestion", filename = uploaded_file.name)
-                loader = PyPDFLoader(str(temp_path))
-                docs = loader.load()
-                documents.extend(docs)
+            with self.tracer.span("parse") as span:
+                documents = [doc for uploaded_file in uploaded_files for doc in self._load_upload(uploaded_file)]
+                span["documents"] = len(documents)
             self.log.info("PDF files loaded", count=len(documents))
             return self._create_retriever(documents)
         except Exception as e:
             self.log.error("Error ingesting files", error=str(e))
             raise DocumentPortalException("Error ingesting files", sys)
+
+    def _load_upload(self, uploaded_file) -> list:
+        unique_filename = f"session_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.pdf"
+        temp_path = self.data_dir / unique_filename
+        
+        data = read_upload(uploaded_file)
+        
+        if self.in_memory:
+            # parse from the upload buffer; persisting is optional and off the request path
+            if self.persist_uploads:
+                write_buffer_async(data, temp_path)
+            # the unique path is the source either way, so uploads with the same name stay distinct
+            docs = load_documents_from_bytes(data, ".pdf", uploaded_file.name, source=str(temp_path))
+        else:
+            write_buffer(data, temp_path)
+            self.log.info("Pdf saved for ingestion", filename = uploaded_file.name)
+            from langchain_community.document_loaders import PyPDFLoader
+            docs = PyPDFLoader(str(temp_path)).load()
+        for doc in docs:
+            doc.metadata["file_name"] = uploaded_file.name
+        return docs
         
     def _create_retriever(self, documents):
         try:
             
-            splitter = RecursiveCharacterTextSplitter(chunk_size = 1000, chunk_overlap = 300)
-            texts = splitter.split_documents(documents)
+            with self.tracer.span("split", documents=len(documents)) as span:
+                splitter = get_text_splitter()
+                texts = splitter.split_documents(documents)
+                span["chunks"] = len(texts)
             self.log.info("Documents split into text", count=len(texts))
             
             embeddings = self.model_loader.load_embeddings()
             
-            vectorstore = FAISS.from_documents(documents=texts, embedding=embeddings)
-            vectorstore.save_local(str(self.faiss_dir))
-            self.log.info("FAISS index created and saved", faiss_path=str(self.faiss_dir))
-            retriever = vectorstore.as_retriever(search_type = "similarity",search_kwargs ={"k":5})
+            with self.tracer.span("embed", chunks=len(texts)):
+                vectors = embeddings.embed_documents([t.page_content for t in texts])
+            with self.tracer.span("faiss_build", chunks=len(texts)):
+                vectorstore = build_vectorstore(
+                    list(zip([t.page_content for t in texts], vectors)), embeddings, metadatas=[t.metadata for t in texts]
+                )
+                lexical_index = None
+                if hybrid_enabled():
+                    lexical_index = BM25Index()
+                    lexical_index.add(t.page_content for t in texts)
+                save_vectorstore(vectorstore, self.session_faiss_dir,
+                                 sidecars={BM25Index.FILE_NAME: lexical_index} if lexical_index is not None else None)
+            self.log.info("FAISS index created and saved", faiss_path=str(self.session_faiss_dir), session_id=self.session_id)
+            retriever = build_retriever(vectorstore, lexical_index=lexical_index)
             self.log.info("Retriver is created",retriver_type = str(type(retriever)))
             return retriever
         except Exception as e:
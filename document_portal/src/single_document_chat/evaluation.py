@@ -0,0 +1,74 @@
+"""
+Offline benchmark and evaluation of single-document chat.
+
+Ingests the PDF fixtures under data/ and synthetic PDFs with the fake models and
+measures ingest throughput, index build time, retrieval latency, recall@k on
+labeled questions and peak RSS.
+
+Usage (from the project root):
+    python -m src.single_document_chat.evaluation [--scales 50 500] [--update-baseline]
+
+Exits with status 1 if any metric regressed against the stored baseline.
+"""
+import sys
+import time
+from pathlib import Path
+from utils.config_loader import load_config
+from utils.tracing import get_tracer
+from utils.evaluation import (
+    PROJECT_ROOT, fixture_uploads, load_questions, measure_queries, peak_rss_mb,
+    percentiles_ms, recall_hit, run_suite, stage_delta,
+)
+
+SUITE = "single_document_chat"
+
+
+def load_fixtures():
+    pdfs = sorted((PROJECT_ROOT / "data").rglob("*.pdf"))
+    return fixture_uploads(pdfs), load_questions("single_doc_chat")
+
+
+def run_corpus(name: str, uploads: list, questions: list, workdir: Path) -> dict:
+    from src.single_document_chat.data_ingestion import SingleDocIngestor
+
+    eval_config = load_config().get("evaluation", {})
+    top_k = load_config().get("retriever", {}).get("top_k", 10)
+    tracer = get_tracer()
+    tracer.enabled = True
+
+    before = tracer.snapshot()
+    start = time.perf_counter()
+    ingestor = SingleDocIngestor(data_dir=str(workdir / "uploads"), faiss_dir=str(workdir / "faiss_index"),
+                                 in_memory=True, persist_uploads=False)
+    retriever = ingestor.ingest_files(uploads)
+    ingest_s = time.perf_counter() - start
+    after = tracer.snapshot()
+
+    pages = stage_delta(before, after, "parse", "documents")
+    chunks = stage_delta(before, after, "split", "chunks")
+    retrieval_ms, retrieved = measure_queries(retriever.invoke, questions, repeats=eval_config.get("repeats", 5))
+    hits = sum(recall_hit(docs[:top_k], q["expected"]) for docs, q in zip(retrieved, questions))
+
+    return {
+        "files": len(uploads),
+        "pages": int(pages),
+        "chunks": int(chunks),
+        "questions": len(questions),
+        "ingest_s": round(ingest_s, 3),
+        "pages_per_s": round(pages / ingest_s, 2),
+        "chunks_per_s": round(chunks / ingest_s, 2),
+        "index_build_s": round(stage_delta(before, after, "faiss_build"), 4),
+        "embed_s": round(stage_delta(before, after, "embed"), 4),
+        **percentiles_ms(retrieval_ms, "retrieval"),
+        "recall_at_k": round(hits / len(questions), 4) if questions else None,
+        "k": top_k,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    return run_suite(SUITE, run_corpus, {"fixtures": load_fixtures}, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,48 @@
 import sys
-import streamlit as st
 import os
+import time
+from typing import AsyncIterator, Iterator
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_community.vectorstores import FAISS
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from requests import session
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+from langchain.chains import create_retrieval_chain
 from utils.model_loader import Model_Loader
 from exception.custom_exception import DocumentPortalException
 from logger.custom_logger import CustomLogger
 from prompt.prompt_library import PROMPT_REGISTRY
 from models.model import PromptType
+from utils.tracing import get_tracer, TracingCallbackHandler
+from utils.query_router import QueryRouter
+from utils.session_index import get_session_index_manager
+from utils.chat_history import get_chat_history, llm_summarizer
+from utils.retriever_factory import build_retriever
+from utils.context_packer import get_context_packer
 
 class ConversationalRAG:
     def __init__(self, session_id: str, retriever)-> None:
         try:
             self.log = CustomLogger().get_logger(__name__)
             self.session_id = session_id
+            self.tracer = get_tracer()
             self.retriever = retriever
             self.llm = self._load_llm()
+            self.summarize_history = llm_summarizer(self.llm)
             self.contextualize_prompt = PROMPT_REGISTRY[PromptType.CONTEXTUALIZE_QUESTION.value]
             self.qa_prompt = PROMPT_REGISTRY[PromptType.CONTEXT_QA.value]
-            self.history_aware_retriever = create_history_aware_retriever(self.llm, self.retriever, self.contextualize_prompt)
+            self.question_rewriter = self.contextualize_prompt | self.llm | StrOutputParser()
+            self.router = QueryRouter(
+                rewrite=lambda question, history: self.question_rewriter.invoke({"input": question, "chat_history": history}),
+                retrieve=lambda question: self.retriever.invoke(question),
+            )
+            # rewrites only follow-up questions, with speculative retrieval of the raw question
+            self.history_aware_retriever = RunnableLambda(
+                lambda inputs: self.router.route(inputs["input"], inputs.get("chat_history"))[1]
+            )
             self.log.info("Created history aware retriver", session_id = self.session_id)
-            self.qa_chain = create_stuff_documents_chain(self.llm, self.qa_prompt)
+            self.packer = get_context_packer(Model_Loader().llm_settings().get("context_tokens"))
+            # retrieved chunks are packed into source-tagged blocks within the model's context budget
+            self.qa_chain = RunnableLambda(self._pack_context) | self.qa_prompt | self.llm | StrOutputParser()
             self.rag_chain = create_retrieval_chain(self.history_aware_retriever, self.qa_chain)
             self.log.info("Created RAG chain", session_id = self.session_id)
 
@@ -51,16 +68,19 @@ class ConversationalRAG:
             self.log.error("Error loading LLM", error=str(e))
             raise DocumentPortalException("Error loading LLM", sys)
         
-    def _get_session_history(self, session_id: str):
-        try:
-            if "store" not in st.session_state:
-                st.session_state.store = {}
-
-            if session_id not in st.session_state.store:
-                st.session_state.store[session_id] = ChatMessageHistory()
-                self.log.info("New chat session history created", session_id=session_id)
+    def _pack_context(self, inputs: dict) -> dict:
+        with self.tracer.span("context_pack", session_id=self.session_id) as span:
+            context, report = self.packer.pack(inputs["context"])
+            span.update(report)
+        return {**inputs, "context": context}
 
-            return st.session_state.store[session_id]
+    def _get_session_history(self, session_id: str) -> BaseChatMessageHistory:
+        """
+        Persistent history of the session, windowed to the chat_history token budget;
+        older turns are rolled into a summary by the LLM.
+        """
+        try:
+            return get_chat_history(session_id, summarize=self.summarize_history)
         except Exception as e:
             self.log.error("Error getting session history", error=str(e))
             raise DocumentPortalException("Error getting session history", sys)
@@ -71,9 +91,10 @@ class ConversationalRAG:
             if not os.path.isdir(index_path):
                 raise FileNotFoundError(f"FAISS index directory not found {index_path}")
             
-            vectorstore = FAISS.load_local(index_path, embeddings)
+            # opened memory-mapped and shared with other requests for this session
+            session_index = get_session_index_manager().get(self.session_id, index_path, embeddings)
             self.log.info("Loaded retriever from FAISS index", index_path=index_path)
-            return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k":5})
+            return session_index.derive("retriever", lambda vs: build_retriever(vs, index_dir=index_path))
         except Exception as e:
             self.log.error("Error loading the retriever from faiss vector db", error=str(e))
             raise DocumentPortalException("Error retriving from faiss vector db",sys)
@@ -81,10 +102,8 @@ class ConversationalRAG:
     def invoke(self, user_input: str)-> str:
         try:
             print(self.session_id)
-            response = self.chain.invoke(
-                {"input": user_input},
-                config={"configurable": {"session_id": self.session_id}}
-            )
+            with self.tracer.span("rag_invoke", session_id=self.session_id):
+                response = self.chain.invoke({"input": user_input}, config=self._run_config())
             answer = response.get("answer","No answer")
             if not answer:
                 self.log.warning("Empty answer received", session_id = self.session_id)
@@ -95,4 +114,63 @@ class ConversationalRAG:
             self.log.error("Failed to load Conversational RAG", error=str(e), session_id = self.session_id)
             raise DocumentPortalException("Failed to load Conversational RAG", sys)
         
-        
\ No newline at end of file
+        
+
+    def stream(self, user_input: str) -> Iterator[str]:
+        """
+        Same as invoke(), but yields the answer tokens as the LLM produces them.
+        The session history is updated once the stream has finished; the time to
+        the first token is recorded as the "ttft" stage.
+        """
+        try:
+            start = time.perf_counter()
+            parts = []
+            with self.tracer.span("rag_stream", session_id=self.session_id) as span:
+                for chunk in self.chain.stream({"input": user_input}, config=self._run_config()):
+                    token = chunk.get("answer")
+                    if not token:
+                        continue
+                    if not parts:
+                        span["ttft_ms"] = self._record_ttft(start)
+                    parts.append(token)
+                    yield token
+            self._log_streamed(user_input, "".join(parts))
+        except Exception as e:
+            self.log.error("Failed to stream Conversational RAG", error=str(e), session_id = self.session_id)
+            raise DocumentPortalException("Failed to stream Conversational RAG", sys)
+
+    async def astream(self, user_input: str) -> AsyncIterator[str]:
+        """Async variant of stream()."""
+        try:
+            start = time.perf_counter()
+            parts = []
+            with self.tracer.span("rag_stream", session_id=self.session_id) as span:
+                async for chunk in self.chain.astream({"input": user_input}, config=self._run_config()):
+                    token = chunk.get("answer")
+                    if not token:
+                        continue
+                    if not parts:
+                        span["ttft_ms"] = self._record_ttft(start)
+                    parts.append(token)
+                    yield token
+            self._log_streamed(user_input, "".join(parts))
+        except Exception as e:
+            self.log.error("Failed to stream Conversational RAG", error=str(e), session_id = self.session_id)
+            raise DocumentPortalException("Failed to stream Conversational RAG", sys)
+
+    def _run_config(self) -> dict:
+        # retrieval and LLM runs inside the chain are traced through callbacks
+        return {
+            "configurable": {"session_id": self.session_id},
+            "callbacks": [TracingCallbackHandler(self.tracer, self.session_id)],
+        }
+
+    def _record_ttft(self, start: float) -> float:
+        ttft_ms = (time.perf_counter() - start) * 1000
+        self.tracer.record("ttft", ttft_ms, session_id=self.session_id)
+        return round(ttft_ms, 3)
+
+    def _log_streamed(self, user_input: str, answer: str) -> None:
+        if not answer:
+            self.log.warning("Empty answer received", session_id = self.session_id)
+        self.log.info("Chain streamed successfully", session_id = self.session_id, user_input= user_input, answer_preview=answer[:150])
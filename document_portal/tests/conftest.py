@@ -0,0 +1,39 @@
+import sys
+import shutil
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Scratch working directory with a copy of config/, so caches, indexes and traces stay out of the tree."""
+    shutil.copytree(PROJECT_ROOT / "config", tmp_path / "config")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def offline_models(workdir, monkeypatch):
+    """Model_Loader switched to the deterministic fake LLM and embeddings."""
+    from utils.model_loader import Model_Loader
+
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "fake")
+    Model_Loader.invalidate()
+    yield
+    Model_Loader.invalidate()
+
+
+def make_pdf(*pages: str) -> bytes:
+    """A small PDF with one page per text."""
+    import fitz
+
+    pdf = fitz.open()
+    for text in pages:
+        pdf.new_page().insert_text((72, 72), text)
+    data = pdf.tobytes()
+    pdf.close()
+    return data
@@ -0,0 +1,76 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from utils.chat_history import (InMemoryChatHistoryStore, SQLiteChatHistoryStore, WindowedChatHistory, message_tokens,
+                                trim_messages)
+from utils.token_counter import count_tokens
+
+TURN = "Which clauses of the supply agreement cover late delivery penalties and their caps?"
+
+
+def _turns(count):
+    messages = []
+    for i in range(count):
+        messages += [HumanMessage(content=f"{i}: {TURN}"), AIMessage(content=f"{i}: Clauses 4.{i} and 7.{i} cover them.")]
+    return messages
+
+
+def test_trim_keeps_the_newest_turns_from_a_question():
+    messages = _turns(6)
+    budget = sum(message_tokens(m) for m in messages[-3:])
+    window = trim_messages(messages, budget)
+    # the oldest message that fits is an answer, so the window starts at the question after it
+    assert window == messages[-2:]
+
+
+def test_trim_truncates_an_oversized_multimodal_message():
+    message = HumanMessage(content=[{"type": "text", "text": TURN * 20},
+                                    {"type": "image_url", "image_url": {"url": "data:image/png;base64," + "A" * 4000}}])
+    [trimmed] = trim_messages([message], 50)
+
+    assert isinstance(trimmed.content, str) and TURN.startswith(trimmed.content[:40])
+    assert message_tokens(trimmed) <= 50
+
+
+def test_roll_moves_the_oldest_turns_into_the_summary():
+    calls = []
+    summarize = lambda previous, messages: calls.append(messages) or f"summary of {len(messages)} messages"
+    history = WindowedChatHistory("s", InMemoryChatHistoryStore(), max_tokens=200, summarize=summarize)
+    messages = _turns(6)
+    history.add_messages(messages)
+
+    session = history.store.load("s")
+    kept = [m for _, m in session.messages]
+    assert calls == [messages[:len(messages) - len(kept)]]
+    assert isinstance(kept[0], HumanMessage) and sum(message_tokens(m) for m in kept) <= 100
+    assert session.summarized_upto == session.messages[0][0]
+    assert history.messages == [SystemMessage(content=f"Summary of the earlier conversation: {session.summary}"), *kept]
+
+    # under budget again, so the next turn does not roll
+    history.add_messages([HumanMessage(content="Thanks")])
+    assert len(calls) == 1
+
+
+def test_summary_is_capped_at_summary_max_tokens():
+    long_summary = lambda previous, messages: TURN * 50
+    for summarize in (long_summary, None, lambda previous, messages: 1 / 0):
+        history = WindowedChatHistory("s", InMemoryChatHistoryStore(), max_tokens=200, summary_max_tokens=40, summarize=summarize)
+        history.add_messages(_turns(12))
+        summary = history.store.load("s").summary
+        assert summary and count_tokens(summary) <= 40
+
+
+def test_sqlite_store_persists_messages_and_summary(tmp_path):
+    db_path = tmp_path / "history.sqlite"
+    store = SQLiteChatHistoryStore(db_path=str(db_path))
+    messages = _turns(3)
+    store.append("s", messages)
+    store.save_summary("s", "earlier turns", summarized_upto=2)
+    store.save_summary("s", "stale roll", summarized_upto=1)  # ignored
+
+    session = SQLiteChatHistoryStore(db_path=str(db_path)).load("s")
+    assert (session.summary, session.summarized_upto) == ("earlier turns", 2)
+    assert session.messages == list(zip(range(2, 6), messages[2:]))
+    assert session.next_seq == 6
+
+    store.clear("s")
+    session = SQLiteChatHistoryStore(db_path=str(db_path)).load("s")
+    assert (session.summary, session.messages) == ("", [])
@@ -0,0 +1,82 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.chunking import TokenChunker, get_text_splitter, token_pieces
+from utils.token_counter import count_tokens
+
+SENTENCES = [f"Sentence number {i} talks about clause 4.{i} and the part_no A-{1000 + i}." for i in range(60)]
+TEXT = "\n\n".join(" ".join(SENTENCES[i:i + 5]) for i in range(0, 60, 5))
+
+
+def _check_spans(chunker, text):
+    spans = chunker.split_spans(text)
+    for start, end, tokens in spans:
+        assert tokens == count_tokens(text[start:end])
+        assert tokens <= chunker.chunk_tokens
+    return spans
+
+
+def _ends_at_lines(text, spans):
+    return all(end == len(text) or text[end] == "\n" for _, end, _ in spans)
+
+
+def test_token_pieces_count_like_count_tokens():
+    for text in (TEXT, "naïve café — 数据 🙂 über-long-identifier_with_parts", "  \n\t "):
+        assert int(token_pieces(text)[2].sum()) == count_tokens(text)
+
+
+def test_chunks_fit_the_budget_and_overlap():
+    spans = _check_spans(TokenChunker(chunk_tokens=60, overlap_tokens=12), TEXT)
+
+    assert len(spans) > 1
+    assert spans[0][0] == 0 and spans[-1][1] == len(TEXT)
+    for (_, previous_end, _), (start, _, _) in zip(spans, spans[1:]):
+        assert start < previous_end
+    # chunks end at a sentence end
+    assert all(TEXT[end - 1] == "." for _, end, _ in spans)
+
+
+def test_overlap_starts_at_a_sentence_when_one_is_in_reach():
+    # sentences are 18 tokens, so 24 tokens of overlap always reach back to one
+    spans = _check_spans(TokenChunker(chunk_tokens=60, overlap_tokens=24), TEXT)
+    assert all(TEXT[start:].startswith("Sentence") for start, _, _ in spans)
+
+
+def test_a_heading_starts_a_new_chunk_without_overlap():
+    text = " ".join(SENTENCES[:8]) + "\n2.1 Scope of the agreement\n" + " ".join(SENTENCES[8:10])
+    spans = _check_spans(TokenChunker(chunk_tokens=200, overlap_tokens=40, min_chunk_tokens=10), text)
+
+    heading = text.index("2.1 Scope")
+    assert [start for start, _, _ in spans] == [0, heading]
+    assert spans[0][1] <= heading
+
+
+def test_fast_path_breaks_at_line_ends_only():
+    words = " ".join(SENTENCES).split()
+    text = "\n".join(" ".join(words[i:i + 7]) for i in range(0, len(words), 7))
+
+    spans = _check_spans(TokenChunker(chunk_tokens=60, overlap_tokens=12, fast_path_chars=100), text)
+    assert len(spans) > 1 and _ends_at_lines(text, spans)
+    # below fast_path_chars the same text is cut at sentence ends, not line ends
+    assert not _ends_at_lines(text, _check_spans(TokenChunker(chunk_tokens=60, overlap_tokens=12), text))
+
+
+def test_empty_and_blank_text_have_no_chunks():
+    chunker = TokenChunker()
+    assert chunker.split_spans("") == []
+    assert chunker.split_documents([Document(page_content=" \n\n ")]) == []
+
+
+def test_split_documents_keeps_metadata_and_start_index():
+    chunks = TokenChunker(chunk_tokens=60, overlap_tokens=12).split_documents([Document(page_content=TEXT, metadata={"page": 3})])
+    assert all(c.metadata["page"] == 3 and TEXT[c.metadata["start_index"]:].startswith(c.page_content) for c in chunks)
+
+
+def test_get_text_splitter_selects_the_strategy():
+    chunker = get_text_splitter({"strategy": "token", "chunk_tokens": 80, "overlap_tokens": 10})
+    assert isinstance(chunker, TokenChunker) and (chunker.chunk_tokens, chunker.overlap_tokens) == (80, 10)
+    assert isinstance(get_text_splitter({"strategy": "recursive"}), RecursiveCharacterTextSplitter)
+    with pytest.raises(ValueError):
+        get_text_splitter({"strategy": "semantic"})
+    with pytest.raises(ValueError):
+        TokenChunker(chunk_tokens=40, overlap_tokens=40)
@@ -0,0 +1,73 @@
+from langchain_core.documents import Document
+from src.multi_document_chat.contextualcompression import ContextCompressor
+from utils.fake_models import HashingEmbeddings
+from utils.context_packer import ContextPacker, merge_overlapping, source_label
+from utils.token_counter import count_tokens
+
+OVERLAP = "the shared span between two chunks"
+
+
+def _doc(text, source="/tmp/session_1.pdf", page=0, file_name="report.pdf"):
+    return Document(page_content=text, metadata={"source": source, "page": page, "file_name": file_name})
+
+
+def test_merge_overlapping_writes_the_shared_span_once():
+    first = f"Opening words and {OVERLAP}"
+    second = f"{OVERLAP} followed by new text"
+    assert merge_overlapping(first, second) == f"Opening words and {OVERLAP} followed by new text"
+    assert merge_overlapping(first, "unrelated text that does not continue it") is None
+    assert merge_overlapping(first, OVERLAP) == first
+
+
+def test_source_label_uses_the_file_name_and_one_based_page():
+    assert source_label({"file_name": "report.pdf", "source": "/tmp/x.pdf", "page": 2}) == "source: report.pdf, page 3"
+    assert source_label({"source": "/tmp/notes.txt"}) == "source: notes.txt"
+    assert source_label({}) == "source: unknown"
+
+
+def test_pack_groups_chunks_by_page_and_merges_neighbours():
+    docs = [
+        _doc(f"Opening words and {OVERLAP}"),
+        _doc("Text from the second page", page=1),
+        _doc(f"{OVERLAP} followed by new text"),
+    ]
+    context, report = ContextPacker(max_tokens=1000).pack(docs)
+
+    assert context == (
+        f"[source: report.pdf, page 1]\nOpening words and {OVERLAP} followed by new text\n\n"
+        "[source: report.pdf, page 2]\nText from the second page"
+    )
+    assert (report["chunks"], report["blocks"], report["merged_chunks"], report["skipped_chunks"]) == (3, 2, 1, 0)
+    assert report["output_tokens"] <= 1000
+
+
+def test_same_named_uploads_stay_in_separate_blocks():
+    docs = [_doc("first upload", source="/tmp/a.pdf"), _doc("second upload", source="/tmp/b.pdf")]
+    context, report = ContextPacker().pack(docs)
+    assert report["blocks"] == 2
+    assert context.count("[source: report.pdf, page 1]") == 2
+
+
+def test_chunks_over_the_budget_are_skipped_in_rank_order():
+    short = _doc("a short chunk")
+    long = _doc(" ".join(["filler"] * 200), page=1)
+    budget = count_tokens("[source: report.pdf, page 1]") + count_tokens("a short chunk") + 5
+    context, report = ContextPacker(max_tokens=budget).pack([short, long, _doc("   ", page=2)])
+
+    assert context == "[source: report.pdf, page 1]\na short chunk"
+    assert report["skipped_chunks"] == 1
+    assert report["output_tokens"] <= budget
+
+
+def test_compressing_to_the_text_budget_leaves_the_packer_nothing_to_skip():
+    docs = [_doc(" ".join(f"Clause {p}.{i} sets the penalty for late delivery of part {i}." for i in range(12)), page=p)
+            for p in range(4)]
+    packer = ContextPacker(max_tokens=200)
+    budget = packer.text_budget(docs)
+    assert budget == 200 - sum(count_tokens(f"[{source_label(doc.metadata)}]") for doc in docs)
+
+    compressed, report = ContextCompressor(HashingEmbeddings(32), similarity_threshold=-1).compress(
+        "late delivery penalty", docs, max_tokens=budget)
+    assert budget - 20 < report["output_tokens"] <= budget
+    context, report = packer.pack(compressed)
+    assert report["skipped_chunks"] == 0 and report["output_tokens"] <= 200
@@ -0,0 +1,33 @@
+import os
+import uuid
+import multiprocessing
+from pathlib import Path
+import pytest
+from logger.custom_logger import CustomLogger, _LogBackend
+
+# created at import time, like the loggers of the ingestion modules
+log = CustomLogger().get_logger(__name__)
+
+
+def _log_in_child(marker: str) -> None:
+    log.info("Logged in a forked worker", marker=marker)
+    # records go to the parent's listener; the child opens no log file of its own
+    assert _LogBackend.listener is None and _LogBackend.forwarding
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_module_level_logger_writes_from_forked_worker():
+    marker = uuid.uuid4().hex
+    logs_dir = Path(_LogBackend.log_file_path).parent
+    log_files = set(logs_dir.glob("*.log"))
+    child = multiprocessing.get_context("fork").Process(target=_log_in_child, args=(marker,))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+
+    _LogBackend.stop()  # drains the forwarded records into the file
+    try:
+        assert set(logs_dir.glob("*.log")) == log_files
+        assert marker in Path(_LogBackend.log_file_path).read_text(encoding="utf-8")
+    finally:
+        _LogBackend.restart()
@@ -0,0 +1,67 @@
+import pytest
+from langchain_core.documents import Document
+from utils.docstore import FaissIdMap, SQLiteDocstore
+from utils.fake_models import HashingEmbeddings
+from utils.faiss_store import build_vectorstore, load_vectorstore, save_vectorstore
+
+EMBEDDINGS = HashingEmbeddings(32)
+FLAT = {"index_type": "flat"}
+
+
+def _docs(*texts, start=0):
+    return {str(start + i): Document(page_content=text, metadata={"n": start + i}) for i, text in enumerate(texts)}
+
+
+def test_faiss_id_map_is_the_identity():
+    id_map = FaissIdMap()
+    id_map[0] = "0"
+    id_map[1] = "1"
+    assert (len(id_map), list(id_map), id_map[1]) == (2, [0, 1], "1")
+    with pytest.raises(KeyError):
+        id_map[2]
+    with pytest.raises(ValueError):
+        id_map[2] = "chunk-2"
+
+
+def test_pending_chunks_are_read_before_saving():
+    docstore = SQLiteDocstore()
+    docstore.add(_docs("alpha", "beta"))
+
+    assert docstore.search("1").page_content == "beta"
+    assert docstore.search("7") == "ID 7 not found."
+    assert len(docstore) == 2
+    with pytest.raises(ValueError):
+        docstore.add({"chunk": Document(page_content="gamma")})
+
+
+def test_save_and_attach_keep_saved_and_pending_chunks(tmp_path):
+    docstore = SQLiteDocstore()
+    docstore.add(_docs("alpha", "beta"))
+    docstore.save(tmp_path / "first.sqlite")
+    docstore.attach(tmp_path / "first.sqlite")
+    docstore.add(_docs("gamma", start=2))
+
+    docs = docstore.mget(["2", "0", "9", "not-an-id"])
+    assert [d and (d.id, d.page_content, d.metadata) for d in docs] == [
+        ("2", "gamma", {"n": 2}), ("0", "alpha", {"n": 0}), None, None,
+    ]
+    docstore.save(tmp_path / "second.sqlite")
+    reopened = SQLiteDocstore(tmp_path / "second.sqlite")
+    assert [d.page_content for d in reopened.mget(["0", "1", "2"])] == ["alpha", "beta", "gamma"]
+    assert len(reopened) == 3
+
+
+def test_vectorstore_refuses_deletes_before_changing_anything(tmp_path):
+    texts = ["alpha beta", "gamma delta", "epsilon zeta"]
+    vectorstore = build_vectorstore(list(zip(texts, EMBEDDINGS.embed_documents(texts))), EMBEDDINGS, index_config=FLAT)
+    save_vectorstore(vectorstore, tmp_path / "session")
+
+    with pytest.raises(NotImplementedError, match="re-ingest"):
+        vectorstore.delete(["1"])
+    assert vectorstore.index.ntotal == 3
+    assert [d.page_content for d in vectorstore.docstore.mget(["0", "1", "2"])] == texts
+
+    loaded = load_vectorstore(tmp_path / "session", EMBEDDINGS, index_config=FLAT)
+    with pytest.raises(NotImplementedError):
+        loaded.delete(["0"])
+    assert loaded.similarity_search("gamma delta", k=1)[0].page_content == "gamma delta"
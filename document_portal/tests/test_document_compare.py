@@ -0,0 +1,23 @@
+from src.document_compare.data_ingestion import DocumentIngestion
+from src.document_compare.document_compare import DocumentComparatorLLM
+from src.document_compare.page_diff import split_combined_documents
+from tests.conftest import make_pdf
+
+
+def test_split_combined_documents_round_trips_combine_documents(workdir):
+    ingestion = DocumentIngestion(base_dir=str(workdir / "compare"))
+    (workdir / "compare" / "a_v1.pdf").write_bytes(make_pdf("Alpha one", "", "Alpha three"))
+    (workdir / "compare" / "b_v2.pdf").write_bytes(make_pdf("Beta one", "Beta two"))
+
+    documents = split_combined_documents(ingestion.combine_documents())
+    assert documents == [("a_v1.pdf", ["Alpha one", "", "Alpha three"]), ("b_v2.pdf", ["Beta one", "Beta two"])]
+
+
+def test_compare_documents_runs_page_wise(offline_models, monkeypatch):
+    comparator = DocumentComparatorLLM()
+    calls = []
+    monkeypatch.setattr(comparator, "compare_pages", lambda *args: calls.append(args) or "page-wise")
+    combined = "Document: v1.pdf\n\n-- Page 1 -- \n Same\n\nDocument: v2.pdf\n\n-- Page 1 -- \n Same\n\n-- Page 2 -- \n New"
+
+    assert comparator.compare_documents(combined) == "page-wise"
+    assert calls == [(["Same"], ["Same", "New"], "v1.pdf", "v2.pdf")]
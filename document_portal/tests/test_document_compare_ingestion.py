@@ -0,0 +1,16 @@
+from tests.conftest import make_pdf
+from utils.evaluation import InMemoryUpload
+from src.document_compare.data_ingestion import DocumentIngestion
+
+
+def test_uploads_with_the_same_name_are_both_compared(workdir):
+    ingestion = DocumentIngestion(base_dir=str(workdir / "compare"))
+    reference = InMemoryUpload(make_pdf("Version one text"), "report.pdf")
+    actual = InMemoryUpload(make_pdf("Version two text"), "report.pdf")
+
+    combined = ingestion.combine_uploaded_documents(reference, actual, persist=False)
+    assert "Document: report.pdf\n" in combined and "Document: report (2).pdf\n" in combined
+    assert "Version one text" in combined and "Version two text" in combined
+
+    ref_path, act_path = ingestion.save_uploaded_files(reference, actual)
+    assert ref_path != act_path and ref_path.read_bytes() != act_path.read_bytes()
@@ -0,0 +1,19 @@
+from utils.evaluation import compare_with_baseline
+
+
+def _results(**metrics):
+    return {"corpora": {"synthetic_50": {"recall_at_k": 1.0, "retrieval_p50_ms": 10.0, "retrieval_p99_ms": 12.0,
+                                         "answer_p50_ms": 10.0, "answer_p99_ms": 12.0, **metrics}}}
+
+
+def test_p99_outliers_are_not_regressions():
+    assert compare_with_baseline(_results(answer_p99_ms=60.0, retrieval_p99_ms=60.0), _results()) == []
+
+
+def test_median_latency_and_recall_are_gated():
+    regressions = compare_with_baseline(_results(answer_p50_ms=20.0, recall_at_k=0.9), _results())
+    assert regressions == ["synthetic_50.recall_at_k: 0.9 vs baseline 1.0", "synthetic_50.answer_p50_ms: 20.0 vs baseline 10.0"]
+
+
+def test_changes_under_the_noise_floor_are_ignored():
+    assert compare_with_baseline(_results(retrieval_p50_ms=2.5), _results(retrieval_p50_ms=1.0)) == []
@@ -0,0 +1,161 @@
+import os
+import json
+import threading
+import numpy as np
+import pytest
+from utils.docstore import DOCSTORE_FILE
+from utils.fake_models import HashingEmbeddings
+from utils.faiss_store import (add_embeddings, build_index, build_vectorstore, index_exists, index_type_of, index_version,
+                               load_vectorstore, read_saved_index, save_vectorstore, upgrade_index)
+
+EMBEDDINGS = HashingEmbeddings(32)
+FLAT = {"index_type": "flat"}
+VECTORS = np.random.default_rng(0).standard_normal((400, 32)).astype(np.float32)
+
+
+def _approximate(index_type):
+    # small enough to train on a few hundred vectors; nprobe covers every list, so IVF search is exact
+    return {"index_type": index_type, "train_threshold": 100, "ivf": {"nlist": 4, "nprobe": 4},
+            "hnsw": {"m": 8, "ef_construction": 40, "ef_search": 24}, "pq": {"code_size": 8, "nbits": 4}}
+
+
+def _vectorstore(texts):
+    pairs = list(zip(texts, EMBEDDINGS.embed_documents(texts)))
+    return build_vectorstore(pairs, EMBEDDINGS, metadatas=[{"n": i} for i in range(len(texts))], index_config=FLAT)
+
+
+class _Sidecar:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def save(self, path):
+        path.write_text(json.dumps(self.payload))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index_dir = tmp_path / "session"
+    vectorstore = _vectorstore(["alpha beta", "gamma delta"])
+    save_vectorstore(vectorstore, index_dir, sidecars={"extra.json": _Sidecar([1, 2])})
+
+    assert index_exists(index_dir)
+    assert json.loads((index_dir / "extra.json").read_text()) == [1, 2]
+    # the in-memory store now reads its chunks from the saved docstore
+    assert vectorstore.docstore.search("1").page_content == "gamma delta"
+
+    loaded = load_vectorstore(index_dir, EMBEDDINGS, index_config=FLAT)
+    assert loaded.index.ntotal == 2
+    hit = loaded.similarity_search("gamma delta", k=1)[0]
+    assert (hit.page_content, hit.metadata) == ("gamma delta", {"n": 1})
+
+
+def test_save_replaces_the_previous_index(tmp_path):
+    index_dir = tmp_path / "session"
+    save_vectorstore(_vectorstore(["first"]), index_dir, sidecars={"extra.json": _Sidecar("old")})
+    vectorstore = load_vectorstore(index_dir, EMBEDDINGS, index_config=FLAT)
+    add_embeddings(vectorstore, [("second", EMBEDDINGS.embed_query("second"))], [{"n": 1}])
+    save_vectorstore(vectorstore, index_dir)
+
+    loaded = load_vectorstore(index_dir, EMBEDDINGS, index_config=FLAT)
+    assert [d.page_content for d in loaded.docstore.mget(["0", "1"])] == ["first", "second"]
+    assert not (index_dir / "extra.json").exists()
+    # no temp or backup directories are left next to it
+    assert [p.name for p in tmp_path.iterdir()] == ["session"]
+
+
+def test_save_refuses_a_directory_holding_other_indexes(tmp_path):
+    base = tmp_path / "faiss_index"
+    save_vectorstore(_vectorstore(["session text"]), base / "session_1")
+
+    with pytest.raises(ValueError):
+        save_vectorstore(_vectorstore(["other"]), base)
+    assert index_exists(base / "session_1")
+    assert (base / "session_1" / DOCSTORE_FILE).is_file()
+
+
+def _count_vectors(index_dir):
+    return load_vectorstore(index_dir, EMBEDDINGS, index_config=FLAT).index.ntotal
+
+
+def test_read_saved_index_waits_for_a_swap(tmp_path):
+    index_dir = tmp_path / "session"
+    save_vectorstore(_vectorstore(["one", "two"]), index_dir)
+    # the window between save_vectorstore's two renames: the old version is parked aside
+    os.replace(index_dir, tmp_path / ".session.old-1234")
+    threading.Timer(0.05, os.replace, (tmp_path / ".session.old-1234", index_dir)).start()
+
+    version, vectors = read_saved_index(index_dir, _count_vectors)
+    assert (version, vectors) == (index_version(index_dir), 2)
+
+
+def test_read_saved_index_raises_when_no_save_is_running(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_saved_index(tmp_path / "missing", _count_vectors)
+
+
+def test_session_manager_opens_an_index_mid_swap(tmp_path):
+    from utils.session_index import SessionIndexManager
+
+    index_dir = tmp_path / "session"
+    save_vectorstore(_vectorstore(["one", "two", "three"]), index_dir)
+    os.replace(index_dir, tmp_path / ".session.old-1234")
+    threading.Timer(0.05, os.replace, (tmp_path / ".session.old-1234", index_dir)).start()
+
+    entry = SessionIndexManager(mmap=False).get("session", index_dir, EMBEDDINGS)
+    assert entry.vectorstore.index.ntotal == 3
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "ivfpq", "pq", "hnsw"])
+def test_build_index_trains_the_configured_type(index_type):
+    index = build_index(VECTORS, _approximate(index_type))
+    assert index_type_of(index) == index_type and index.is_trained
+
+    index.add(VECTORS)
+    _, ids = index.search(VECTORS[:10], 1)
+    assert (ids >= 0).all()
+    if index_type in ("ivf", "hnsw"):
+        # no vector compression, so every vector finds itself
+        assert ids[:, 0].tolist() == list(range(10))
+
+
+def test_build_index_stays_flat_below_the_train_threshold():
+    assert index_type_of(build_index(VECTORS[:99], _approximate("ivfpq"))) == "flat"
+
+
+def test_upgrade_index_retrains_in_place_and_keeps_ids():
+    import faiss
+
+    config = _approximate("ivf")
+    texts = [f"chunk {i} covers clause {i * 7} of section {i % 9}" for i in range(150)]
+    vectorstore = build_vectorstore(list(zip(texts[:60], EMBEDDINGS.embed_documents(texts[:60]))), EMBEDDINGS,
+                                    metadatas=[{"n": i} for i in range(60)], index_config=config)
+    assert not upgrade_index(vectorstore, config)  # still below train_threshold
+
+    add_embeddings(vectorstore, list(zip(texts[60:], EMBEDDINGS.embed_documents(texts[60:]))),
+                   metadatas=[{"n": i} for i in range(60, 150)])
+    assert upgrade_index(vectorstore, config)
+    assert index_type_of(vectorstore.index) == "ivf" and vectorstore.index.ntotal == 150
+    assert faiss.extract_index_ivf(vectorstore.index).nprobe == 4
+    for i in (0, 59, 60, 149):
+        assert vectorstore.similarity_search(texts[i], k=1)[0].metadata == {"n": i}
+    assert not upgrade_index(vectorstore, config)  # already trained
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_load_restores_the_search_parameters(tmp_path, mmap):
+    import faiss
+
+    texts = [f"chunk {i} covers clause {i * 7}" for i in range(150)]
+    pairs = list(zip(texts, EMBEDDINGS.embed_documents(texts)))
+    for index_type in ("ivf", "hnsw"):
+        config = _approximate(index_type)
+        index_dir = tmp_path / index_type
+        save_vectorstore(build_vectorstore(pairs, EMBEDDINGS, index_config=config), index_dir)
+
+        index = load_vectorstore(index_dir, EMBEDDINGS, index_config=config, mmap=mmap).index
+        assert index_type_of(index) == index_type
+        if index_type == "ivf":
+            assert faiss.extract_index_ivf(index).nprobe == 4
+            # the direct map is rebuilt as well, so vectors can be reconstructed by id
+            assert np.allclose(index.reconstruct(7), pairs[7][1], atol=1e-6)
+        else:
+            assert faiss.downcast_index(index).hnsw.efSearch == 24
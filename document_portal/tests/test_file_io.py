@@ -0,0 +1,14 @@
+from utils.file_io import load_documents_from_bytes, unique_name
+
+
+def test_unique_name_suffixes_repeated_names():
+    taken = set()
+    assert [unique_name("report.pdf", taken) for _ in range(3)] == ["report.pdf", "report (2).pdf", "report (3).pdf"]
+    assert unique_name("notes.txt", taken) == "notes.txt"
+
+
+def test_load_documents_from_bytes_source_defaults_to_file_name():
+    docs = load_documents_from_bytes(b"hello", ".txt", "a.txt")
+    assert docs[0].metadata == {"source": "a.txt"}
+    docs = load_documents_from_bytes(b"hello", ".txt", "a.txt", source="/tmp/1234.txt")
+    assert docs[0].metadata == {"source": "/tmp/1234.txt"}
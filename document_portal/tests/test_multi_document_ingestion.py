@@ -0,0 +1,19 @@
+from utils.evaluation import InMemoryUpload
+from src.multi_document_chat.data_ingestion import DocumentIngestor
+
+
+def _ingestor(workdir, **kwargs):
+    return DocumentIngestor(temp_dir=str(workdir / "uploads"), faiss_dir=str(workdir / "faiss_index"), parse_workers=1, **kwargs)
+
+
+def test_uploads_with_the_same_name_are_all_indexed(offline_models, workdir):
+    for in_memory in (True, False):
+        ingestor = _ingestor(workdir, in_memory=in_memory, persist_uploads=False)
+        retriever = ingestor.ingest_files([
+            InMemoryUpload(b"The first report covers apples.", "report.txt"),
+            InMemoryUpload(b"The second report covers pears.", "report.txt"),
+        ])
+        docs = retriever.vectorstore.similarity_search("report", k=10)
+        assert {d.page_content for d in docs} == {"The first report covers apples.", "The second report covers pears."}
+        assert len({d.metadata["source"] for d in docs}) == 2
+        assert {d.metadata["file_name"] for d in docs} == {"report.txt"}
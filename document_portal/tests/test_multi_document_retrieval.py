@@ -0,0 +1,46 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from utils.evaluation import InMemoryUpload
+from src.multi_document_chat.answer_cache import get_answer_cache
+from src.multi_document_chat.data_ingestion import DocumentIngestor
+from src.multi_document_chat.retrieval import ConversationalRag
+
+
+def _rag(workdir):
+    ingestor = DocumentIngestor(temp_dir=str(workdir / "uploads"), faiss_dir=str(workdir / "faiss_index"), parse_workers=1)
+    retriever = ingestor.ingest_files([InMemoryUpload(b"The first product ships in May. The second ships in June.", "plan.txt")])
+    get_answer_cache().invalidate()
+    return ConversationalRag(ingestor.session_id, retriever=retriever)
+
+
+def test_answer_cache_serves_only_questions_without_history(offline_models, workdir, monkeypatch):
+    rag = _rag(workdir)
+    answered = []
+    answer = rag._answer
+    monkeypatch.setattr(rag, "_answer", lambda *args: answered.append(args[0]) or answer(*args))
+
+    rag.invoke("When does the first product ship?")
+    rag.invoke("When does the first product ship?")
+    assert len(answered) == 1
+
+    question = "What about the second one?"
+    for topic in ("products", "invoices"):
+        rag.invoke(question, [HumanMessage(content=f"Tell me about {topic}"), AIMessage(content=f"Here are the {topic}.")])
+    assert answered[1:] == [question, question]
+
+
+def test_answer_cache_keys_follow_ups_by_the_rewritten_question(offline_models, workdir, monkeypatch):
+    rag = _rag(workdir)
+    answered = []
+    answer = rag._answer
+    monkeypatch.setattr(rag, "_answer", lambda *args: answered.append(args[0]) or answer(*args))
+    rewrites = {"products": "When does the second product ship?", "invoices": "When is the second invoice due?"}
+    monkeypatch.setattr(rag.router, "rewrite", lambda question, history: rewrites[history[0].content.split()[-1]])
+
+    def follow_up(topic):
+        return rag.invoke("What about the second one?", [HumanMessage(content=f"Tell me about {topic}"), AIMessage(content="Sure.")])
+
+    standalone = rag.invoke("When does the second product ship?")
+    assert follow_up("products") == standalone
+    follow_up("invoices")
+    follow_up("invoices")
+    assert answered == ["When does the second product ship?", "What about the second one?"]
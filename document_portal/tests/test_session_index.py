@@ -0,0 +1,86 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import utils.session_index as session_index
+from utils.fake_models import HashingEmbeddings
+from utils.faiss_store import build_vectorstore, save_vectorstore
+from utils.session_index import SessionIndexManager
+
+EMBEDDINGS = HashingEmbeddings(32)
+FLAT = {"index_type": "flat"}
+
+
+def _save(index_dir, count=3):
+    texts = [f"{index_dir.name} chunk {i}" for i in range(count)]
+    vectorstore = build_vectorstore(list(zip(texts, EMBEDDINGS.embed_documents(texts))), EMBEDDINGS, index_config=FLAT)
+    save_vectorstore(vectorstore, index_dir)
+    return index_dir
+
+
+def test_least_recently_used_session_is_evicted_past_max_sessions(tmp_path):
+    manager = SessionIndexManager(max_sessions=2, mmap=False)
+    dirs = {name: _save(tmp_path / name) for name in "abc"}
+
+    manager.get("a", dirs["a"], EMBEDDINGS)
+    manager.get("b", dirs["b"], EMBEDDINGS)
+    manager.get("a", dirs["a"], EMBEDDINGS)  # a is now the most recently used
+    manager.get("c", dirs["c"], EMBEDDINGS)
+    assert list(manager._entries) == ["a", "c"]
+    stats = manager.stats()
+    assert (stats["open_sessions"], stats["hits"], stats["loads"], stats["evictions"]) == (2, 1, 3, 1)
+
+    manager.get("b", dirs["b"], EMBEDDINGS)
+    assert (manager.loads, list(manager._entries)) == (4, ["c", "b"])
+
+
+def test_sessions_are_evicted_past_the_memory_budget(tmp_path):
+    dirs = [_save(tmp_path / name) for name in "abc"]
+    probe = SessionIndexManager(mmap=False)
+    resident = probe.get("probe", dirs[0], EMBEDDINGS).resident_bytes
+    assert resident > 0
+
+    manager = SessionIndexManager(max_sessions=10, memory_budget_mb=2.5 * resident / 2**20, mmap=False)
+    for i, index_dir in enumerate(dirs):
+        manager.get(str(i), index_dir, EMBEDDINGS)
+    assert list(manager._entries) == ["1", "2"] and manager.evictions == 1
+    assert manager.resident_bytes() <= manager.memory_budget_bytes
+
+    # the most recently used index stays open even when it alone is over budget
+    tiny = SessionIndexManager(memory_budget_mb=resident / 2**20 / 2, mmap=False)
+    tiny.get("0", dirs[0], EMBEDDINGS)
+    tiny.get("1", dirs[1], EMBEDDINGS)
+    assert list(tiny._entries) == ["1"]
+
+
+def test_index_saved_again_is_reopened(tmp_path):
+    manager = SessionIndexManager()
+    index_dir = _save(tmp_path / "session", count=3)
+    first = manager.get("s", index_dir, EMBEDDINGS)
+    retriever = first.derive("retriever", lambda vs: object())
+    assert manager.get("s", index_dir, EMBEDDINGS) is first
+
+    _save(index_dir, count=5)
+    second = manager.get("s", index_dir, EMBEDDINGS)
+    assert second is not first and second.fingerprint != first.fingerprint
+    assert second.vectorstore.index.ntotal == 5
+    assert second.derive("retriever", lambda vs: object()) is not retriever
+    assert (manager.hits, manager.loads) == (1, 2)
+
+
+def test_concurrent_requests_share_one_load(tmp_path, monkeypatch):
+    manager = SessionIndexManager()
+    index_dir = _save(tmp_path / "session")
+    calls = []
+    load = session_index.load_vectorstore
+
+    def slow_load(*args, **kwargs):
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(session_index, "load_vectorstore", slow_load)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        entries = list(pool.map(lambda _: manager.get("s", index_dir, EMBEDDINGS), range(8)))
+
+    assert len(calls) == 1 and manager.loads == 1
+    assert all(entry is entries[0] for entry in entries)
@@ -0,0 +1,19 @@
+from tests.conftest import make_pdf
+from utils.evaluation import InMemoryUpload
+from utils.faiss_store import index_exists
+from src.multi_document_chat.data_ingestion import DocumentIngestor
+from src.single_document_chat.data_ingestion import SingleDocIngestor
+
+
+def test_single_doc_ingest_keeps_multi_doc_sessions(offline_models, workdir):
+    faiss_dir = workdir / "faiss_index"
+    multi = DocumentIngestor(temp_dir=str(workdir / "multi"), faiss_dir=str(faiss_dir), parse_workers=1)
+    multi.ingest_files([InMemoryUpload(b"Multi-document session text.", "notes.txt")])
+    assert index_exists(multi.session_faiss_dir)
+
+    single = SingleDocIngestor(data_dir=str(workdir / "single"), faiss_dir=str(faiss_dir))
+    single.ingest_files([InMemoryUpload(make_pdf("Single document text."), "single.pdf")])
+
+    assert index_exists(multi.session_faiss_dir)
+    assert index_exists(single.session_faiss_dir)
+    assert single.session_faiss_dir.parent == faiss_dir
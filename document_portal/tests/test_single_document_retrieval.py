@@ -0,0 +1,23 @@
+from tests.conftest import make_pdf
+from utils.evaluation import InMemoryUpload
+from src.single_document_chat.data_ingestion import SingleDocIngestor
+from src.single_document_chat.retrieval import ConversationalRAG
+
+
+def _rag(workdir, session_id="single-session"):
+    ingestor = SingleDocIngestor(data_dir=str(workdir / "uploads"), faiss_dir=str(workdir / "faiss_index"))
+    retriever = ingestor.ingest_files([InMemoryUpload(make_pdf("The warranty lasts two years."), "warranty.pdf")])
+    return ConversationalRAG(session_id, retriever)
+
+
+def test_speculative_retrieval_is_traced(offline_models, workdir, monkeypatch):
+    rag = _rag(workdir)
+    stages = []
+    record = rag.tracer.record
+    monkeypatch.setattr(rag.tracer, "record", lambda stage, *args, **kwargs: stages.append(stage) or record(stage, *args, **kwargs))
+
+    rag.invoke("How long does the warranty last?")
+    assert stages.count("retrieval") == 1
+    # a follow-up goes through the router's thread pool (speculative retrieval)
+    rag.invoke("And what about it?")
+    assert stages.count("retrieval") == 2
@@ -0,0 +1,148 @@
+import re
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from utils.faiss_store import get_documents
+
+# identifiers such as "4.2.1", "A-1234" or "part_no" stay whole; their parts are indexed too
+_TERM = re.compile(r"[^\W_]+(?:[.\-_/][^\W_]+)*")
+_PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for match in _TERM.finditer(text.lower()):
+        term = match.group()
+        terms.append(term)
+        if not term.isalnum():
+            terms.extend(_PART.findall(term))
+    return terms
+
+
+class BM25Index:
+    """
+    Compact in-process inverted index with Okapi BM25 scoring. Documents are
+    numbered in insertion order, which matches their position in the FAISS index
+    they are built alongside. Postings are kept as lists while documents are
+    added and packed into NumPy arrays on the first search after a change.
+    """
+    FILE_NAME = "bm25.json"
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._packed = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts: Iterable[str]) -> None:
+        """Index texts as the next documents, numbered from len(self)."""
+        for text in texts:
+            doc_id = len(self.doc_lengths)
+            terms = tokenize(text)
+            self.doc_lengths.append(len(terms))
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                ids, tfs = self.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        self._packed = None
+
+    def _pack(self):
+        if self._packed is None:
+            lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+            avg_length = float(lengths.mean()) if len(lengths) else 0.0
+            norms = self.k1 * (1 - self.b + self.b * lengths / avg_length) if avg_length else np.full(len(lengths), self.k1)
+            postings = {
+                term: (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+                for term, (ids, tfs) in self.postings.items()
+            }
+            self._packed = (norms.astype(np.float32), postings)
+        return self._packed
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Return up to k (doc id, score) pairs, best first."""
+        if not self.doc_lengths:
+            return []
+        norms, postings = self._pack()
+        scores = np.zeros(len(norms), dtype=np.float32)
+        total = len(norms)
+        for term in set(tokenize(query)):
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            idf = math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norms[ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in ranked]
+
+    def save(self, path) -> None:
+        payload = {"k1": self.k1, "b": self.b, "doc_lengths": self.doc_lengths, "postings": self.postings}
+        Path(path).write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path) -> "BM25Index":
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.doc_lengths = payload["doc_lengths"]
+        index.postings = {term: (ids, tfs) for term, (ids, tfs) in payload["postings"].items()}
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "BM25Index":
+        """Rebuild the index from the chunks stored in a FAISS vectorstore, in FAISS id order."""
+        index = cls(**kwargs)
+        index.add(
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+            for i in range(vectorstore.index.ntotal)
+        )
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Any]], rrf_k: int = 60) -> List[Any]:
+    """Fuse several ranked lists of keys: each key scores sum(1 / (rrf_k + rank))."""
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses vector hits with BM25 hits from the lexical index using reciprocal rank
+    fusion, so exact identifiers (clause numbers, part numbers, names) that embed
+    poorly are still found. The lexical side needs no embedding call.
+    """
+    vectorstore: Any
+    vector_retriever: BaseRetriever
+    lexical_index: Any
+    k: int = 10
+    lexical_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector_docs = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        by_key = {doc.id or doc.page_content: doc for doc in vector_docs}
+        # lexical hits are ranked by docstore id; only those that survive fusion are read
+        lexical_ids = {self.vectorstore.index_to_docstore_id[faiss_id]: faiss_id
+                       for faiss_id, _ in self.lexical_index.search(query, self.lexical_k)}
+        fused = reciprocal_rank_fusion([list(by_key), list(lexical_ids)], self.rrf_k)[:self.k]
+        missing = [lexical_ids[key] for key in fused if key not in by_key]
+        by_key.update((doc.id, doc) for doc in get_documents(self.vectorstore, missing))
+        return [by_key[key] for key in fused if key in by_key]
@@ -0,0 +1,304 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, messages_from_dict, messages_to_dict
+from utils.config_loader import load_config
+from utils.token_counter import count_tokens, truncate_tokens
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+# role markers and separators the chat template adds around every message
+_MESSAGE_OVERHEAD = 4
+
+# summarize(previous_summary, older_messages) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return count_tokens(content) + _MESSAGE_OVERHEAD
+
+
+def _text_content(content) -> str:
+    """Text of a message's content; of multimodal content only its text parts, which can be cut."""
+    if isinstance(content, str):
+        return content
+    parts = [part if isinstance(part, str) else part.get("text", "") for part in content
+             if isinstance(part, str) or part.get("type") == "text"]
+    return "\n".join(parts)
+
+
+def trim_messages(messages: Sequence[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """
+    Newest messages that fit in max_tokens, starting at a human turn where possible.
+    If the newest message alone is over budget, it is kept truncated (as text only,
+    if its content is multimodal).
+    """
+    window, used = [], 0
+    for message in reversed(messages):
+        tokens = message_tokens(message)
+        if used + tokens > max_tokens:
+            if not window:
+                content = truncate_tokens(_text_content(message.content), max(0, max_tokens - _MESSAGE_OVERHEAD))
+                window.append(message.model_copy(update={"content": content}))
+            break
+        window.append(message)
+        used += tokens
+    window.reverse()
+    # an answer without its question only confuses the rewrite and QA prompts
+    while len(window) > 1 and not isinstance(window[0], HumanMessage):
+        window.pop(0)
+    return window
+
+
+class SessionHistory:
+    """What a store holds for one session: the rolled-up summary and the turns after it."""
+    def __init__(self, summary: str = "", summarized_upto: int = 0, messages: Optional[List[Tuple[int, BaseMessage]]] = None):
+        self.summary = summary
+        self.summarized_upto = summarized_upto  # sequence number of the first message not in the summary
+        self.messages = messages or []          # (sequence number, message), oldest first
+
+    @property
+    def next_seq(self) -> int:
+        return self.messages[-1][0] + 1 if self.messages else self.summarized_upto
+
+
+class ChatHistoryStore:
+    """
+    Where chat sessions are kept. Subclasses persist them; reads are served from a
+    process-level LRU cache of sessions, so a turn does not reload its history.
+    """
+    def __init__(self, cache_sessions: int = 256):
+        self.cache_sessions = cache_sessions
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+    def load(self, session_id: str) -> SessionHistory:
+        with self._lock:
+            session = self._cache.get(session_id)
+            if session is None:
+                session = self._cache[session_id] = self._read(session_id)
+                while len(self._cache) > self.cache_sessions:
+                    self._cache.popitem(last=False)
+            self._cache.move_to_end(session_id)
+            return session
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage]) -> None:
+        with self._lock:
+            session = self.load(session_id)
+            rows = [(session.next_seq + i, message) for i, message in enumerate(messages)]
+            self._write_messages(session_id, rows)
+            session.messages.extend(rows)
+
+    def save_summary(self, session_id: str, summary: str, summarized_upto: int) -> None:
+        """Replace the summary; messages before summarized_upto are no longer loaded. Stale rolls are ignored."""
+        with self._lock:
+            session = self.load(session_id)
+            if summarized_upto <= session.summarized_upto:
+                return
+            self._write_summary(session_id, summary, summarized_upto)
+            session.summary, session.summarized_upto = summary, summarized_upto
+            session.messages = [(seq, m) for seq, m in session.messages if seq >= summarized_upto]
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._delete(session_id)
+            self._cache.pop(session_id, None)
+
+    def _read(self, session_id: str) -> SessionHistory:
+        return SessionHistory()
+
+    def _write_messages(self, session_id: str, rows: List[Tuple[int, BaseMessage]]) -> None:
+        pass
+
+    def _write_summary(self, session_id: str, summary: str, summarized_upto: int) -> None:
+        pass
+
+    def _delete(self, session_id: str) -> None:
+        pass
+
+
+class InMemoryChatHistoryStore(ChatHistoryStore):
+    """Sessions kept in this process only; nothing is evicted."""
+    def __init__(self):
+        super().__init__(cache_sessions=float("inf"))
+
+
+class SQLiteChatHistoryStore(ChatHistoryStore):
+    """
+    Sessions persisted in a local SQLite file: every message, plus the rolled-up
+    summary and the point it covers. Only the messages after the summary are read.
+    """
+    def __init__(self, db_path: str = "cache/chat_history.sqlite", cache_sessions: int = 256):
+        super().__init__(cache_sessions=cache_sessions)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                   session_id TEXT NOT NULL,
+                   seq INTEGER NOT NULL,
+                   message TEXT NOT NULL,
+                   PRIMARY KEY (session_id, seq)
+               )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS summaries (
+                   session_id TEXT PRIMARY KEY,
+                   summary TEXT NOT NULL,
+                   summarized_upto INTEGER NOT NULL
+               )"""
+        )
+        self._conn.commit()
+        log.info("Chat history store ready", db_path=str(self.db_path))
+
+    def _read(self, session_id: str) -> SessionHistory:
+        row = self._conn.execute(
+            "SELECT summary, summarized_upto FROM summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        summary, upto = row if row else ("", 0)
+        rows = self._conn.execute(
+            "SELECT seq, message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq", (session_id, upto)
+        ).fetchall()
+        messages = messages_from_dict([json.loads(message) for _, message in rows])
+        return SessionHistory(summary, upto, [(seq, m) for (seq, _), m in zip(rows, messages)])
+
+    def _write_messages(self, session_id: str, rows: List[Tuple[int, BaseMessage]]) -> None:
+        payloads = messages_to_dict([message for _, message in rows])
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO messages(session_id, seq, message) VALUES (?, ?, ?)",
+            [(session_id, seq, json.dumps(payload)) for (seq, _), payload in zip(rows, payloads)],
+        )
+        self._conn.commit()
+
+    def _write_summary(self, session_id: str, summary: str, summarized_upto: int) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO summaries(session_id, summary, summarized_upto) VALUES (?, ?, ?)",
+            (session_id, summary, summarized_upto),
+        )
+        self._conn.commit()
+
+    def _delete(self, session_id: str) -> None:
+        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+        self._conn.commit()
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """
+    Chat history of one session, bounded for prompts: messages returns the summary
+    of older turns followed by the newest turns within max_tokens. When the turns
+    kept verbatim outgrow max_tokens, the oldest are rolled into the summary until
+    half the budget is left, so the summarizer runs every few turns rather than
+    on each one. The summary is capped at summary_max_tokens.
+    """
+    def __init__(self, session_id: str, store: ChatHistoryStore, max_tokens: int = 1500,
+                 summary_max_tokens: int = 300, summarize: Optional[Summarizer] = None):
+        self.session_id = session_id
+        self.store = store
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarize = summarize
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        session = self.store.load(self.session_id)
+        window = trim_messages([m for _, m in session.messages], self.max_tokens)
+        if session.summary:
+            window.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {session.summary}"))
+        return window
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.store.append(self.session_id, messages)
+        self._roll()
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+
+    def _roll(self) -> None:
+        session = self.store.load(self.session_id)
+        kept = list(session.messages)
+        tokens = sum(message_tokens(m) for _, m in kept)
+        if tokens <= self.max_tokens:
+            return
+        rolled = []
+        while kept and (tokens > self.max_tokens // 2 or not isinstance(kept[0][1], HumanMessage)):
+            seq, message = kept.pop(0)
+            rolled.append(message)
+            tokens -= message_tokens(message)
+        summarized_upto = kept[0][0] if kept else session.next_seq
+        summary = self._summarize(session.summary, rolled)
+        self.store.save_summary(self.session_id, summary, summarized_upto)
+        log.info("Chat history rolled into summary", session_id=self.session_id, rolled_messages=len(rolled),
+                 kept_messages=len(kept), summary_tokens=count_tokens(summary))
+
+    def _summarize(self, previous: str, messages: List[BaseMessage]) -> str:
+        if self.summarize is not None:
+            try:
+                return truncate_tokens(self.summarize(previous, messages), self.summary_max_tokens)
+            except Exception as e:
+                log.warning("Chat history summarization failed, keeping a truncated transcript", session_id=self.session_id, error=str(e))
+        # without a summarizer, keep the most recent lines of the transcript that fit
+        lines = [previous] if previous else []
+        lines += [f"{m.type}: {m.content}" for m in messages]
+        kept, used = [], 0
+        for line in reversed(lines):
+            used += count_tokens(line)
+            if used > self.summary_max_tokens:
+                break
+            kept.append(line)
+        return "\n".join(reversed(kept))
+
+
+def llm_summarizer(llm) -> Summarizer:
+    """Summarizer that asks llm to extend the running summary with the rolled turns."""
+    from langchain_core.output_parsers import StrOutputParser
+    from models.model import PromptType
+    from prompt.prompt_library import PROMPT_REGISTRY
+
+    chain = PROMPT_REGISTRY[PromptType.SUMMARIZE_HISTORY.value] | llm | StrOutputParser()
+    return lambda previous, messages: chain.invoke({"summary": previous or "(none)", "chat_history": messages})
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chat_history_store() -> ChatHistoryStore:
+    """Process-wide chat history store from the chat_history block in config.yaml."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            history_config = load_config().get("chat_history", {})
+            if history_config.get("backend", "sqlite") == "memory":
+                _store = InMemoryChatHistoryStore()
+            else:
+                _store = SQLiteChatHistoryStore(
+                    db_path=history_config.get("db_path", "cache/chat_history.sqlite"),
+                    cache_sessions=history_config.get("cache_sessions", 256),
+                )
+        return _store
+
+
+def get_chat_history(session_id: str, summarize: Optional[Summarizer] = None) -> WindowedChatHistory:
+    """Windowed history of one session, with the budgets from the chat_history block in config.yaml."""
+    history_config = load_config().get("chat_history", {})
+    return WindowedChatHistory(
+        session_id,
+        get_chat_history_store(),
+        max_tokens=history_config.get("max_tokens", 1500),
+        summary_max_tokens=history_config.get("summary_max_tokens", 300),
+        summarize=summarize,
+    )
+
+
+def history_budget() -> int:
+    """Token budget for a chat_history list passed in by a caller (the chat_history.max_tokens setting)."""
+    return load_config().get("chat_history", {}).get("max_tokens", 1500)
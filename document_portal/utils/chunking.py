@@ -0,0 +1,188 @@
+import re
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from utils.config_loader import load_config
+
+CHUNKING_STRATEGIES = ("token", "recursive")
+
+_SPACE, _WORD, _PUNCTUATION = 0, 1, 2
+_WORD_RUN = re.compile(r"\w+")
+_SPACE_RUN = re.compile(r"\s+")
+_char_classes = None  # class of every BMP code point, built on first use
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*\s")
+# markdown headings, numbered headings ("2.1 Scope") and short all-caps lines
+_HEADING = re.compile(r"^[ \t]*(?:#{1,6}[ \t]+\S|(?:\d+\.)+\d*[ \t]+[A-Z]|[A-Z][A-Z0-9 ,:&/()-]{3,60}[ \t]*$)", re.MULTILINE)
+
+
+def _classify(chars: str) -> np.ndarray:
+    """Class of each character, exactly as the \\w and \\s of count_tokens() see it."""
+    classes = np.full(len(chars), _PUNCTUATION, dtype=np.int8)
+    for pattern, cls in ((_WORD_RUN, _WORD), (_SPACE_RUN, _SPACE)):
+        for m in pattern.finditer(chars):
+            classes[m.start():m.end()] = cls
+    return classes
+
+
+def _bmp_classes() -> np.ndarray:
+    global _char_classes
+    if _char_classes is None:
+        _char_classes = _classify("".join(map(chr, range(0x10000))))
+    return _char_classes
+
+
+def _code_points(text: str) -> np.ndarray:
+    if text.isascii():
+        return np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _pieces(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if codes.dtype == np.uint8:
+        classes = _bmp_classes()[:128][codes]
+    else:
+        classes = _bmp_classes()[np.minimum(codes, 0xFFFF)]
+    astral = codes > 0xFFFF if codes.dtype == np.uint32 else None
+    if astral is not None and astral.any():
+        rare = np.unique(codes[astral])
+        classes[astral] = _classify("".join(map(chr, rare)))[np.searchsorted(rare, codes[astral])]
+    is_word = classes == _WORD
+    is_punctuation = classes == _PUNCTUATION
+    first = is_word.copy()
+    first[1:] &= ~is_word[:-1]
+    last = is_word.copy()
+    last[:-1] &= ~is_word[1:]
+    starts = np.flatnonzero(first | is_punctuation)
+    ends = np.flatnonzero(last | is_punctuation) + 1
+    return starts, ends, 1 + (ends - starts - 1) // 6
+
+
+def token_pieces(text: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (start, end, tokens) arrays of the pieces count_tokens() counts, found with a
+    few vectorized passes over the code points instead of a regex scan.
+    """
+    return _pieces(_code_points(text))
+
+
+class TokenChunker:
+    """
+    Single-pass splitter that sizes chunks by tokens (as count_tokens() counts them).
+    Each input document is split on its own, so chunks never cross a page. A chunk
+    ends at a section heading when one falls inside it, otherwise at the last
+    paragraph or sentence end past half of chunk_tokens; the next chunk repeats
+    about overlap_tokens from a sentence start, except across a heading. Texts
+    longer than fast_path_chars skip the sentence and heading scans and break at
+    line ends only, so their cost stays linear in a few vectorized passes.
+    """
+    def __init__(self, chunk_tokens: int = 200, overlap_tokens: int = 40, min_chunk_tokens: int = 32,
+                 respect_sections: bool = True, fast_path_chars: int = 1_000_000):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.respect_sections = respect_sections
+        self.fast_path_chars = fast_path_chars
+
+    @staticmethod
+    def _piece_index(starts: np.ndarray, positions) -> List[int]:
+        """Sorted indexes of the pieces that begin at or after each (ascending) character position."""
+        index = np.searchsorted(starts, np.fromiter(positions, dtype=np.int64))
+        return index[np.concatenate(([True], index[1:] != index[:-1]))].tolist() if len(index) else []
+
+    @staticmethod
+    def _last_before(breaks: List[int], low: int, high: int) -> int:
+        """Largest break in [low, high], or -1."""
+        i = bisect_right(breaks, high) - 1
+        return breaks[i] if i >= 0 and breaks[i] >= low else -1
+
+    @staticmethod
+    def _first_after(breaks: List[int], low: int) -> int:
+        """Smallest break greater than low, or -1."""
+        i = bisect_right(breaks, low)
+        return breaks[i] if i < len(breaks) else -1
+
+    def split_spans(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, tokens) of each chunk of text, in order."""
+        codes = _code_points(text)
+        starts, ends, tokens = _pieces(codes)
+        n = len(starts)
+        if n == 0:
+            return []
+        cum = np.concatenate(([0], np.cumsum(tokens)))
+        if len(text) > self.fast_path_chars:
+            soft_breaks = [self._piece_index(starts, np.flatnonzero(codes == 10))]
+            sentence_starts, headings = [], []
+        else:
+            paragraphs = self._piece_index(starts, (m.end() for m in _PARAGRAPH_BREAK.finditer(text)))
+            sentence_starts = self._piece_index(starts, (m.end() for m in _SENTENCE_END.finditer(text)))
+            soft_breaks = [paragraphs, sentence_starts]
+            headings = []
+            if self.respect_sections:
+                headings = self._piece_index(starts, (m.start() for m in _HEADING.finditer(text)))
+
+        # one step per chunk; piece lookups are binary searches over the running token count
+        chunk_starts, chunk_ends, i = [], [], 0
+        while i < n:
+            base = int(cum[i])
+            end = min(n, max(i + 1, int(cum.searchsorted(base + self.chunk_tokens, "right")) - 1))
+            heading = self._first_after(headings, i)
+            if 0 < heading <= end and cum[heading] - base >= self.min_chunk_tokens:
+                end, next_start = heading, heading
+            elif end >= n:
+                next_start = n
+            else:
+                low = int(cum.searchsorted(base + self.chunk_tokens // 2, "left"))
+                for breaks in soft_breaks:
+                    cut = self._last_before(breaks, max(low, i + 1), end)
+                    if cut > 0:
+                        end = cut
+                        break
+                next_start = int(cum.searchsorted(cum[end] - self.overlap_tokens, "left"))
+                sentence = self._first_after(sentence_starts, next_start - 1)
+                if 0 <= sentence < end:
+                    next_start = sentence
+                next_start = max(next_start, i + 1)
+            chunk_starts.append(i)
+            chunk_ends.append(end)
+            i = next_start
+        first, last = np.asarray(chunk_starts), np.asarray(chunk_ends)
+        return list(zip(starts[first].tolist(), ends[last - 1].tolist(), (cum[last] - cum[first]).tolist()))
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end, _ in self.split_spans(text)]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """Chunks of every document, with its metadata plus the chunk's start_index in the document."""
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            for start, end, _ in self.split_spans(text):
+                chunks.append(Document(page_content=text[start:end], metadata={**doc.metadata, "start_index": start}))
+        return chunks
+
+
+def get_text_splitter(chunking_config: dict = None):
+    """Splitter selected by chunking.strategy in config.yaml: the token chunker or LangChain's recursive splitter."""
+    if chunking_config is None:
+        chunking_config = load_config().get("chunking", {})
+    strategy = chunking_config.get("strategy", "token")
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ValueError(f"Unsupported chunking.strategy: {strategy}")
+    if strategy == "recursive":
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        recursive = chunking_config.get("recursive", {})
+        return RecursiveCharacterTextSplitter(chunk_size=recursive.get("chunk_size", 1000),
+                                              chunk_overlap=recursive.get("chunk_overlap", 300))
+    return TokenChunker(
+        chunk_tokens=chunking_config.get("chunk_tokens", 200),
+        overlap_tokens=chunking_config.get("overlap_tokens", 40),
+        min_chunk_tokens=chunking_config.get("min_chunk_tokens", 32),
+        respect_sections=chunking_config.get("respect_sections", True),
+        fast_path_chars=chunking_config.get("fast_path_chars", 1_000_000),
+    )
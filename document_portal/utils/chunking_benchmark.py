@@ -0,0 +1,131 @@
+"""
+Chunking benchmark: the configured token chunker against LangChain's recursive
+character splitter, as the ingestors used it (chunk_size=1000, chunk_overlap=300).
+
+Each splitter chunks four corpora: the fixture files under data/, synthetic PDF
+pages (see utils.evaluation.synthetic_corpus), one large page of text built from
+the fixtures, which takes the chunker's fast path, and the same page with its
+whitespace collapsed to single spaces, as text extracted from some PDFs comes.
+For each run it reports chunks, seconds (best of --repeats), chunks/s, MB/s and
+the distribution of chunk sizes in tokens as count_tokens() counts them, with
+the number over chunk_tokens.
+
+Usage:
+    python -m utils.chunking_benchmark [--pages 200] [--large-mb 8] [--repeats 3] [--json results.json]
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.config_loader import load_config
+from utils.chunking import TokenChunker, get_text_splitter
+from utils.file_io import load_documents_from_bytes
+from utils.token_counter import count_tokens
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+FIXTURE_DIRS = ["data/multi_doc_chat", "data/document_compare"]
+
+
+def fixture_documents() -> list:
+    documents = []
+    for directory in FIXTURE_DIRS:
+        for path in sorted((PROJECT_ROOT / directory).iterdir()):
+            if path.suffix.lower() in (".pdf", ".docx", ".txt"):
+                documents.extend(load_documents_from_bytes(path.read_bytes(), path.suffix.lower(), path.name))
+    return documents
+
+
+def synthetic_documents(pages: int) -> list:
+    from utils.evaluation import synthetic_corpus
+
+    uploads, _ = synthetic_corpus(pages)
+    documents = []
+    for upload in uploads:
+        documents.extend(load_documents_from_bytes(upload.getvalue(), ".pdf", upload.name))
+    return documents
+
+
+def large_document(documents: list, megabytes: float) -> list:
+    """One page of at least the given size, repeating the fixture text."""
+    text = "\n\n".join(doc.page_content for doc in documents if doc.page_content.strip())
+    repeats = max(1, int(megabytes * 1_000_000 // max(1, len(text))) + 1)
+    return [Document(page_content="\n\n".join([text] * repeats), metadata={"source": "large.txt"})]
+
+
+def size_distribution(chunks: list, budget: int) -> dict:
+    tokens = np.array([count_tokens(chunk.page_content) for chunk in chunks] or [0])
+    p10, p50, p90 = np.percentile(tokens, [10, 50, 90])
+    return {
+        "min": int(tokens.min()), "p10": float(p10), "p50": float(p50), "p90": float(p90),
+        "max": int(tokens.max()), "mean": round(float(tokens.mean()), 1),
+        "over_budget": int((tokens > budget).sum()),
+    }
+
+
+def measure(splitter, documents: list, repeats: int, budget: int) -> dict:
+    best, chunks = float("inf"), []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = splitter.split_documents(documents)
+        best = min(best, time.perf_counter() - start)
+    megabytes = sum(len(doc.page_content.encode("utf-8")) for doc in documents) / 1_000_000
+    return {
+        "chunks": len(chunks),
+        "seconds": round(best, 4),
+        "chunks_per_second": round(len(chunks) / best, 1) if best else None,
+        "mb_per_second": round(megabytes / best, 2) if best else None,
+        "tokens": size_distribution(chunks, budget),
+    }
+
+
+def run_benchmark(pages: int, large_mb: float, repeats: int, chunking_config: dict) -> list:
+    chunker = get_text_splitter({**chunking_config, "strategy": "token"})
+    splitters = {
+        "recursive": RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=300),
+        "token": chunker,
+    }
+    fixtures = fixture_documents()
+    corpora = {
+        "fixtures": fixtures,
+        "synthetic": synthetic_documents(pages),
+        "large_text": large_document(fixtures, large_mb),
+    }
+    corpora["flat_text"] = [Document(page_content=re.sub(r"\s+", " ", doc.page_content), metadata=doc.metadata)
+                            for doc in corpora["large_text"]]
+    results = []
+    for corpus, documents in corpora.items():
+        for name, splitter in splitters.items():
+            result = measure(splitter, documents, repeats, chunker.chunk_tokens)
+            results.append({"corpus": corpus, "splitter": name, "documents": len(documents), **result})
+    return results
+
+
+def main(argv=None) -> int:
+    config = load_config(str(PROJECT_ROOT / "config" / "config.yaml"))
+    parser = argparse.ArgumentParser(description="Compare the token chunker with the recursive character splitter.")
+    parser.add_argument("--pages", type=int, default=200, help="synthetic PDF pages")
+    parser.add_argument("--large-mb", type=float, default=8, help="size of the single large page")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.pages, args.large_mb, args.repeats, config.get("chunking", {}))
+    print(f"{'corpus':<11} {'splitter':<10} {'chunks':>7} {'seconds':>8} {'chunks/s':>10} {'MB/s':>7}"
+          f"   tokens min/p10/p50/p90/max  over")
+    for r in results:
+        t = r["tokens"]
+        print(f"{r['corpus']:<11} {r['splitter']:<10} {r['chunks']:>7} {r['seconds']:>8.3f} {r['chunks_per_second']:>10.0f}"
+              f" {r['mb_per_second']:>7.1f}   {t['min']:>4}/{t['p10']:.0f}/{t['p50']:.0f}/{t['p90']:.0f}/{t['max']:<5} {t['over_budget']:>5}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
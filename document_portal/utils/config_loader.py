@@ -1,9 +1,23 @@
+import threading
 import yaml
 
+_config_cache = {}
+_config_lock = threading.Lock()
+
 def load_config(config_filepath: str = "config/config.yaml") -> dict:
-    with open(config_filepath, 'r') as file:
-        config = yaml.safe_load(file)
-        #print(config)
-        return config
+    """
+    Load the YAML config once per path and serve later calls from memory.
+    Call clear_config_cache() after the file changes.
+    """
+    with _config_lock:
+        if config_filepath not in _config_cache:
+            with open(config_filepath, 'r') as file:
+                _config_cache[config_filepath] = yaml.safe_load(file)
+                #print(config)
+        return _config_cache[config_filepath]
+
+def clear_config_cache() -> None:
+    with _config_lock:
+        _config_cache.clear()
   
-# load_config("config/config.yaml")  
\ No newline at end of file
+# load_config("config/config.yaml")  
@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from utils.config_loader import load_config
+from utils.token_counter import count_tokens
+
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 20) -> Optional[str]:
+    """
+    first followed by second, with the span they share written once, or None if
+    second does not continue first. The chunk splitter's overlap makes the start of
+    a chunk repeat the end of the one before it.
+    """
+    if second in first:
+        return first
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start:]
+        start = first.find(probe, start + 1)
+    return None
+
+
+def source_label(metadata: dict) -> str:
+    """
+    Citation tag for a chunk: the uploaded file's name (or the source's) and, for
+    paged documents, the 1-based page.
+    """
+    source = metadata.get("file_name") or metadata.get("source")
+    label = f"source: {Path(source).name}" if source else "source: unknown"
+    page = metadata.get("page_label") or (metadata["page"] + 1 if isinstance(metadata.get("page"), int) else None)
+    return f"{label}, page {page}" if page is not None else label
+
+
+def _block_key(metadata: dict) -> Tuple[tuple, str]:
+    """(block key, label) of a chunk; keyed by source too, as two uploads with the same file name are different documents."""
+    label = source_label(metadata)
+    return (metadata.get("source"), label), label
+
+
+class _Block:
+    """The context for one source page: its header and the merged text pieces, in rank order."""
+    def __init__(self, label: str):
+        self.header = f"[{label}]"
+        self.pieces: List[str] = []
+        self.piece_tokens: List[int] = []
+        self.tokens = count_tokens(self.header)
+
+    def render(self) -> str:
+        return "\n".join([self.header, *self.pieces])
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into the QA prompt's context. Chunks from the same source
+    and page share one block tagged with the file name and page; overlapping neighbours
+    within a block are merged so the shared span appears once. Chunks are taken in
+    rank order while they fit in max_tokens; a chunk that does not fit is skipped.
+    Blocks are ordered by their best-ranked chunk.
+
+    When a stage before it already cut the chunks to text_budget(docs) tokens (the
+    multi-document chat's compressor does), every chunk fits and max_tokens does
+    not bind a second time.
+    """
+    def __init__(self, max_tokens: int = 4000, min_overlap_chars: int = 20):
+        self.max_tokens = max_tokens
+        self.min_overlap_chars = min_overlap_chars
+
+    def _merge(self, block: _Block, text: str, tokens: int) -> Tuple[int, str, int]:
+        """(piece index or -1 for a new piece, resulting piece text, its token count)."""
+        for i, piece in enumerate(block.pieces):
+            merged = (merge_overlapping(piece, text, self.min_overlap_chars)
+                      or merge_overlapping(text, piece, self.min_overlap_chars))
+            if merged is not None:
+                return i, merged, count_tokens(merged)
+        return -1, text, tokens
+
+    def text_budget(self, docs: List[Document]) -> int:
+        """Tokens left for chunk text in max_tokens once the block headers docs would need are paid for."""
+        labels = dict(_block_key(doc.metadata) for doc in docs if doc.page_content.strip())
+        return max(0, self.max_tokens - sum(count_tokens(f"[{label}]") for label in labels.values()))
+
+    def pack(self, docs: List[Document]) -> Tuple[str, dict]:
+        """Return the context text and a report of what was merged and skipped."""
+        blocks = {}
+        budget = self.max_tokens
+        report = {"chunks": len(docs), "input_tokens": 0, "merged_chunks": 0, "skipped_chunks": 0}
+        for doc in docs:
+            text = doc.page_content.strip()
+            if not text:
+                continue
+            tokens = count_tokens(text)
+            report["input_tokens"] += tokens
+            key, label = _block_key(doc.metadata)
+            block = blocks.get(key) or _Block(label)
+            index, piece, piece_tokens = self._merge(block, text, tokens)
+            added = piece_tokens - (block.piece_tokens[index] if index >= 0 else 0)
+            cost = added if key in blocks else added + block.tokens
+            if cost > budget:
+                report["skipped_chunks"] += 1
+                continue
+            budget -= cost
+            blocks[key] = block
+            block.tokens += added
+            if index < 0:
+                block.pieces.append(piece)
+                block.piece_tokens.append(piece_tokens)
+            else:
+                block.pieces[index], block.piece_tokens[index] = piece, piece_tokens
+                report["merged_chunks"] += 1
+
+        context = "\n\n".join(block.render() for block in blocks.values())
+        report.update(blocks=len(blocks), output_tokens=self.max_tokens - budget)
+        return context, report
+
+
+def get_context_packer(max_tokens: Optional[int] = None) -> ContextPacker:
+    """
+    Packer from the context_packing block in config.yaml. max_tokens is the active
+    model's context budget (llm.<provider>.context_tokens); the block's max_tokens
+    applies when the model has none.
+    """
+    packing_config = load_config().get("context_packing", {})
+    return ContextPacker(
+        max_tokens=max_tokens or packing_config.get("max_tokens", 4000),
+        min_overlap_chars=packing_config.get("min_overlap_chars", 20),
+    )
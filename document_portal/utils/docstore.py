@@ -0,0 +1,129 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from collections.abc import MutableMapping
+from typing import Dict, List, Optional, Union
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+class FaissIdMap(MutableMapping):
+    """
+    index_to_docstore_id for a SQLiteDocstore: the docstore id of FAISS id i is
+    simply str(i), so the mapping needs no storage at all.
+    """
+    def __init__(self, size: int = 0):
+        self._size = size
+
+    def __getitem__(self, faiss_id: int) -> str:
+        if 0 <= faiss_id < self._size:
+            return str(faiss_id)
+        raise KeyError(faiss_id)
+
+    def __setitem__(self, faiss_id: int, docstore_id: str) -> None:
+        if docstore_id != str(faiss_id):
+            raise ValueError(f"docstore id {docstore_id!r} must be the FAISS id {faiss_id}")
+        self._size = max(self._size, faiss_id + 1)
+
+    def __delitem__(self, faiss_id: int) -> None:
+        raise NotImplementedError("FAISS ids are positional and cannot be deleted")
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Chunk text and metadata in a SQLite file keyed by FAISS id, read lazily: a
+    query loads only its hits, so an open index keeps no chunk text in memory.
+    Chunks added since the last save are held in memory until save() writes a
+    new file; saved files are never modified, so they are opened immutable.
+    """
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self._path = None
+        self._conn = None
+        self._pending: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            self.attach(path)
+
+    def attach(self, path: Union[str, Path]) -> None:
+        """Read from the saved file at path; chunks pending before it was written are dropped."""
+        path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(f"Docstore not found: {path}")
+        conn = sqlite3.connect(f"file:{path.resolve()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._path, self._conn, self._pending = path, conn, {}
+
+    @staticmethod
+    def _faiss_id(docstore_id: str) -> Optional[int]:
+        try:
+            return int(docstore_id)
+        except (TypeError, ValueError):
+            return None
+
+    def search(self, search: str) -> Union[str, Document]:
+        faiss_id = self._faiss_id(search)
+        with self._lock:
+            row = self._pending.get(faiss_id)
+            if row is None and self._conn is not None and faiss_id is not None:
+                row = self._conn.execute("SELECT text, metadata FROM chunks WHERE faiss_id = ?", (faiss_id,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=str(faiss_id), page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, docstore_ids: List[str]) -> List[Optional[Document]]:
+        """Documents for several ids in one query, in the given order (None where missing)."""
+        faiss_ids = [self._faiss_id(i) for i in docstore_ids]
+        with self._lock:
+            rows = {i: self._pending[i] for i in faiss_ids if i in self._pending}
+            wanted = [i for i in faiss_ids if i is not None and i not in rows]
+            if wanted and self._conn is not None:
+                placeholders = ",".join("?" * len(wanted))
+                query = f"SELECT faiss_id, text, metadata FROM chunks WHERE faiss_id IN ({placeholders})"
+                rows.update((i, (text, metadata)) for i, text, metadata in self._conn.execute(query, wanted))
+        return [
+            Document(id=str(i), page_content=rows[i][0], metadata=json.loads(rows[i][1])) if i in rows else None
+            for i in faiss_ids
+        ]
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = {}
+        for docstore_id, doc in texts.items():
+            faiss_id = self._faiss_id(docstore_id)
+            if faiss_id is None:
+                raise ValueError(f"SQLiteDocstore ids must be FAISS ids, got {docstore_id!r}")
+            rows[faiss_id] = (doc.page_content, json.dumps(doc.metadata, default=str))
+        with self._lock:
+            self._pending.update(rows)
+
+    def delete(self, ids: List) -> None:
+        raise NotImplementedError("Chunks are removed by rebuilding the session index")
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the saved chunks plus the pending ones into a new file at path."""
+        dest = sqlite3.connect(str(path))
+        try:
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.backup(dest)
+                pending = list(self._pending.items())
+            dest.execute("CREATE TABLE IF NOT EXISTS chunks (faiss_id INTEGER PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+            dest.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", ((i, t, m) for i, (t, m) in pending))
+            dest.commit()
+        finally:
+            dest.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            saved = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] if self._conn is not None else 0
+            return saved + len(self._pending)
@@ -0,0 +1,137 @@
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import List
+from langchain_core.embeddings import Embeddings
+from logger.custom_logger import CustomLogger
+from exception.custom_exception import DocumentPortalException
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent, content-addressed cache in front of an embeddings model.
+    Vectors are keyed by the hash of the text plus the embedding model name and kept
+    in SQLite; once the cache holds more than max_entries, least recently used rows are evicted.
+    """
+    _SQL_BATCH = 500
+
+    def __init__(self, underlying: Embeddings, model_name: str,
+                 cache_path: str = "cache/embeddings.sqlite", max_entries: int = 200_000):
+        try:
+            self.log = CustomLogger().get_logger(__name__)
+            self.underlying = underlying
+            self.model_name = model_name
+            self.max_entries = int(max_entries)
+            self.cache_path = Path(cache_path)
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       key TEXT PRIMARY KEY,
+                       model TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       last_used REAL NOT NULL
+                   )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self.log.info("Embedding cache ready", cache_path=str(self.cache_path), model=model_name, entries=self._size)
+        except Exception as e:
+            self.log.error("Failed to initialize embedding cache", error=str(e))
+            raise DocumentPortalException("Embedding cache initialization error", sys)
+
+    def _key(self, text: str, kind: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _pack(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _lookup(self, keys: List[str]) -> dict:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), self._SQL_BATCH):
+                batch = keys[i:i + self._SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch).fetchall()
+                found.update((k, self._unpack(v)) for k, v in rows)
+                self._conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})", [now, *batch])
+            self._conn.commit()
+        return found
+
+    def _store(self, items: dict) -> None:
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings(key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(k, self.model_name, self._pack(v), now) for k, v in items.items()],
+            )
+            self._size += self._conn.total_changes - before
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+                self.log.info("Embedding cache evicted entries", evicted=overflow, entries=self._size)
+            self._conn.commit()
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self._key(t, kind) for t in texts]
+        cached = self._lookup(list(dict.fromkeys(keys)))
+
+        # embed each distinct missing text once, in input order
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            if kind == "query":
+                vectors = [self.underlying.embed_query(t) for t in missing.values()]
+            else:
+                vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        self.log.info("Embedding cache lookup", kind=kind, requested=len(texts), hits=len(texts) - len(missing), misses=len(missing))
+        return [cached[k] for k in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, sending only cache misses to the underlying model.
+        """
+        try:
+            return self._embed(list(texts), "document")
+        except Exception as e:
+            self.log.error("Cached document embedding failed", error=str(e))
+            raise DocumentPortalException("Cached document embedding failed", sys)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, sending it to the underlying model only on a cache miss.
+        """
+        try:
+            return self._embed([text], "query")[0]
+        except Exception as e:
+            self.log.error("Cached query embedding failed", error=str(e))
+            raise DocumentPortalException("Cached query embedding failed", sys)
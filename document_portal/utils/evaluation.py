@@ -0,0 +1,231 @@
+"""
+Shared pieces of the offline benchmark and evaluation suites
+(src/multi_document_chat/evaluation.py, src/single_document_chat/evaluation.py).
+
+The suites run without network access: use_offline_models() switches
+Model_Loader to the deterministic fake embeddings and chat model. Corpora are
+the data/ fixtures plus synthetic PDFs with planted facts, so recall@k can be
+measured on labeled questions at any scale. Results are written as JSON and
+compared metric by metric with a stored baseline.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from utils.config_loader import load_config
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# which way each metric must not move; anything else is informational. The p99
+# latencies are reported but not gated: over a few hundred timed queries they come
+# down to a handful of samples, and one scheduler stall moves them well past any
+# sensible tolerance
+HIGHER_IS_BETTER = ("pages_per_s", "chunks_per_s", "recall_at_k")
+LOWER_IS_BETTER = ("index_build_s", "retrieval_p50_ms", "answer_p50_ms", "peak_rss_mb")
+# changes smaller than this (by unit suffix) are timer/allocator noise, never a regression
+NOISE_FLOOR = {"_ms": 2.0, "_s": 0.25, "_mb": 16.0}
+
+_FILLER = (
+    "the of and to in report quarter system process review data team result value market customer service "
+    "product quality change plan budget risk update policy schedule contract supplier delivery analysis "
+    "growth revenue cost margin forecast operations support security compliance training release"
+).split()
+_CITIES = ["Austin", "Leeds", "Osaka", "Lyon", "Pune", "Quito", "Perth", "Tromso", "Accra", "Graz"]
+
+
+class InMemoryUpload(io.BytesIO):
+    """Stand-in for a Streamlit/FastAPI upload: bytes with a file name."""
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def use_offline_models() -> None:
+    """Route Model_Loader to the fake providers, with no API keys or network needed."""
+    from utils.model_loader import Model_Loader
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDING_PROVIDER"] = "fake"
+    Model_Loader.invalidate()
+
+
+def fixture_uploads(paths: List[Path]) -> List[InMemoryUpload]:
+    """Uploads for the non-empty fixture files among paths."""
+    return [InMemoryUpload(p.read_bytes(), p.name) for p in paths if p.is_file() and p.stat().st_size > 0]
+
+
+def load_questions(name: str, questions_path: Optional[str] = None) -> List[dict]:
+    """Labeled questions for one fixture set: [{"question", "expected": [substrings]}]."""
+    path = PROJECT_ROOT / (questions_path or load_config().get("evaluation", {}).get("questions_path", "data/evaluation/questions.json"))
+    return json.loads(path.read_text(encoding="utf-8"))[name]
+
+
+def synthetic_corpus(pages: int, seed: int = 0, words_per_page: int = 350, pages_per_file: int = 25):
+    """
+    Deterministic synthetic PDFs of the given total page count. Every page carries
+    one planted fact among filler text; up to 50 of them become labeled questions.
+    Returns (uploads, questions).
+    """
+    import fitz
+
+    rng = random.Random(seed)
+    uploads, facts = [], []
+    for start in range(0, pages, pages_per_file):
+        pdf = fitz.open()
+        for page_no in range(start, min(start + pages_per_file, pages)):
+            words = rng.choices(_FILLER, k=words_per_page)
+            part_number = f"PN-{rng.randrange(10**5, 10**6)}"
+            city = rng.choice(_CITIES)
+            fact = f"Component C{page_no:05d} has part number {part_number} and ships from {city}."
+            words.insert(rng.randrange(len(words)), fact)
+            page = pdf.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 576, 806), " ".join(words), fontsize=8)
+            facts.append({"question": f"What is the part number of component C{page_no:05d}?", "expected": [part_number]})
+        uploads.append(InMemoryUpload(pdf.tobytes(), f"synthetic_{seed}_{start:05d}.pdf"))
+        pdf.close()
+    questions = rng.sample(facts, min(50, len(facts)))
+    return uploads, questions
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process and its finished children, in MiB."""
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * scale / 2**20, 1)
+
+
+def stage_delta(before: dict, after: dict, stage: str, field: str = "total_seconds") -> float:
+    """How much one tracer stage field grew between two Tracer.snapshot() calls."""
+    return after.get(stage, {}).get(field, 0) - before.get(stage, {}).get(field, 0)
+
+
+def recall_hit(docs, expected: List[str]) -> bool:
+    return any(e in doc.page_content for doc in docs for e in expected)
+
+
+def measure_queries(run: Callable[[str], object], questions: List[dict], repeats: int = 1):
+    """
+    Time run(question) for every question; returns (latencies in ms, results of the
+    first pass). One untimed warm-up call keeps one-off costs (lazy index packing,
+    client setup) out of the percentiles.
+    """
+    latencies, results = [], []
+    if questions:
+        run(questions[0]["question"])
+    for attempt in range(repeats):
+        for question in questions:
+            start = time.perf_counter()
+            result = run(question["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if attempt == 0:
+                results.append(result)
+    return latencies, results
+
+
+def percentiles_ms(latencies: List[float], prefix: str) -> dict:
+    if not latencies:
+        return {}
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {f"{prefix}_p50_ms": round(float(p50), 3), f"{prefix}_p99_ms": round(float(p99), 3)}
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = 0.25, recall_tolerance: float = 0.02) -> List[str]:
+    """
+    Regressions of results against baseline, corpus by corpus. Throughput and
+    median latency may move by tolerance (relative), recall by recall_tolerance
+    (absolute); latency and memory changes under NOISE_FLOOR are ignored.
+    """
+    regressions = []
+    for corpus, metrics in results["corpora"].items():
+        reference = baseline.get("corpora", {}).get(corpus)
+        if reference is None:
+            continue
+        for name, value in metrics.items():
+            base = reference.get(name)
+            if not isinstance(base, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            if name == "recall_at_k":
+                regressed = value < base - recall_tolerance
+            elif name in HIGHER_IS_BETTER:
+                regressed = value < base * (1 - tolerance)
+            elif name in LOWER_IS_BETTER:
+                floor = next((f for suffix, f in NOISE_FLOOR.items() if name.endswith(suffix)), 0.0)
+                regressed = value > base * (1 + tolerance) and value - base > floor
+            else:
+                continue
+            if regressed:
+                regressions.append(f"{corpus}.{name}: {value} vs baseline {base}")
+    return regressions
+
+
+def run_suite(suite: str, run_corpus: Callable[[str, list, list, Path], dict],
+              fixture_sets: Dict[str, Callable[[], tuple]], argv=None) -> int:
+    """
+    Command-line driver shared by the suites: runs every fixture set and synthetic
+    scale through run_corpus(name, uploads, questions, workdir), writes the JSON
+    results and compares them with the baseline. Exits 1 on a regression.
+    """
+    import tempfile
+
+    eval_config = load_config(str(PROJECT_ROOT / "config" / "config.yaml")).get("evaluation", {})
+    parser = argparse.ArgumentParser(description=f"Offline benchmark and evaluation for {suite}.")
+    parser.add_argument("--scales", type=int, nargs="*", default=eval_config.get("synthetic_pages", [50, 500]),
+                        help="page counts of the synthetic corpora")
+    parser.add_argument("--output", default=str(PROJECT_ROOT / "traces" / f"evaluation_{suite}.json"))
+    parser.add_argument("--baseline", default=str(PROJECT_ROOT / eval_config.get("baseline_dir", "data/evaluation/baselines") / f"{suite}.json"))
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=eval_config.get("tolerance", 0.25))
+    args = parser.parse_args(argv)
+
+    use_offline_models()
+    corpora = {}
+    with tempfile.TemporaryDirectory(prefix=f"eval_{suite}_") as tmp:
+        for name, load in fixture_sets.items():
+            uploads, questions = load()
+            if uploads:
+                corpora[name] = run_corpus(name, uploads, questions, Path(tmp) / name)
+        for pages in args.scales:
+            uploads, questions = synthetic_corpus(pages, seed=pages)
+            corpora[f"synthetic_{pages}"] = run_corpus(f"synthetic_{pages}", uploads, questions, Path(tmp) / f"synthetic_{pages}")
+
+    results = {
+        "suite": suite,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "retriever": load_config().get("retriever", {}),
+        "corpora": corpora,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    for name, metrics in corpora.items():
+        print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+    print(f"results written to {output}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline updated: {baseline_path}")
+        return 0
+    if not baseline_path.is_file():
+        print(f"no baseline at {baseline_path}; run with --update-baseline to store one")
+        return 0
+
+    regressions = compare_with_baseline(results, json.loads(baseline_path.read_text(encoding="utf-8")),
+                                        tolerance=args.tolerance, recall_tolerance=eval_config.get("recall_tolerance", 0.02))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed against {baseline_path}")
+        return 1
+    print(f"no regressions against {baseline_path}")
+    return 0
@@ -0,0 +1,333 @@
+import os
+import json
+import math
+import time
+import uuid
+import shutil
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from utils.config_loader import load_config
+from utils.docstore import DOCSTORE_FILE, FaissIdMap, SQLiteDocstore
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+_INDEX_FILE = "index.faiss"
+_META_FILE = "index_meta.json"
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "pq", "hnsw")
+# k-means wants about this many training points per centroid
+_POINTS_PER_CENTROID = 39
+_MAX_TRAINING_POINTS = 100_000
+_locks: dict = {}
+_locks_guard = threading.Lock()
+
+
+def index_exists(index_dir) -> bool:
+    """Return True if a saved FAISS index and its docstore are present in index_dir."""
+    return (Path(index_dir) / _INDEX_FILE).is_file() and (Path(index_dir) / DOCSTORE_FILE).is_file()
+
+
+def index_lock(index_dir) -> threading.Lock:
+    """
+    Process-wide lock for one index directory, so concurrent appends to the same
+    session are serialized instead of overwriting each other.
+    """
+    key = str(Path(index_dir).resolve())
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+
+def index_version(index_dir) -> tuple:
+    """Identity of the saved index in index_dir; save_vectorstore swaps in a new directory, so it changes on every save."""
+    stat = os.stat(Path(index_dir) / _INDEX_FILE)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _save_in_progress(index_dir: Path) -> bool:
+    # save_vectorstore keeps the previous version in a .<name>.old-* sibling until its swap is done
+    return any(index_dir.parent.glob(f".{index_dir.name}.old-*"))
+
+
+def read_saved_index(index_dir, read: Optional[Callable] = None, attempts: int = 50, delay_s: float = 0.005):
+    """
+    (index_version(index_dir), read(index_dir)) from one complete saved version of
+    index_dir. While save_vectorstore is swapping it, index_dir is briefly missing
+    or may be replaced halfway through read; both are retried until the swap is
+    done. Errors while no save is in progress are raised at once.
+    """
+    index_dir = Path(index_dir)
+    for attempt in range(1, attempts + 1):
+        try:
+            version = index_version(index_dir)
+            result = read(index_dir) if read is not None else None
+            if index_version(index_dir) == version:
+                return version, result
+        except (FileNotFoundError, RuntimeError):
+            # FAISS reports a missing index file as RuntimeError
+            if attempt == attempts or not _save_in_progress(index_dir):
+                raise
+        time.sleep(delay_s)
+    raise RuntimeError(f"{index_dir} kept changing while it was read")
+
+def _index_config(index_config: Optional[dict]) -> dict:
+    return load_config().get("faiss_db", {}) if index_config is None else index_config
+
+
+def index_type_of(index) -> str:
+    """Name of the INDEX_TYPES entry a FAISS index was built as."""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def _factory_spec(index_type: str, dimension: int, count: int, index_config: dict) -> Tuple[str, dict]:
+    """faiss.index_factory string and build parameters, scaled down to what count vectors can train."""
+    ivf, hnsw, pq = index_config.get("ivf", {}), index_config.get("hnsw", {}), index_config.get("pq", {})
+    nlist = max(1, min(ivf.get("nlist", 1024), count // _POINTS_PER_CENTROID))
+    code_size = pq.get("code_size", 64)
+    nbits = max(1, min(pq.get("nbits", 8), int(math.log2(max(2, count // _POINTS_PER_CENTROID)))))
+    if index_type in ("ivfpq", "pq") and dimension % code_size:
+        raise ValueError(f"pq.code_size {code_size} must divide the embedding dimension {dimension}")
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat", {"nlist": nlist}
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{code_size}x{nbits}", {"nlist": nlist, "code_size": code_size, "nbits": nbits}
+    if index_type == "pq":
+        return f"PQ{code_size}x{nbits}", {"code_size": code_size, "nbits": nbits}
+    if index_type == "hnsw":
+        return f"HNSW{hnsw.get('m', 32)},Flat", {"m": hnsw.get("m", 32)}
+    return "Flat", {}
+
+
+def prepare_index(index, index_config: Optional[dict] = None) -> dict:
+    """
+    Apply the search-time parameters (IVF nprobe, HNSW efSearch) from config and
+    build the IVF id map that reconstruct() needs. Neither survives a save and
+    load, so this runs after every build and every load. Returns the parameters set.
+    """
+    import faiss
+
+    index_config = _index_config(index_config)
+    index_type = index_type_of(index)
+    params = {}
+    if index_type in ("ivf", "ivfpq"):
+        params["nprobe"] = index_config.get("ivf", {}).get("nprobe", 16)
+        faiss.extract_index_ivf(index).make_direct_map()
+    elif index_type == "hnsw":
+        params["efSearch"] = index_config.get("hnsw", {}).get("ef_search", 64)
+    parameter_space = faiss.ParameterSpace()
+    for name, value in params.items():
+        parameter_space.set_index_parameter(index, name, value)
+    return params
+
+
+def build_index(vectors: np.ndarray, index_config: Optional[dict] = None):
+    """
+    Empty FAISS index of the configured faiss_db.index_type, trained on vectors.
+    Below train_threshold vectors (or for index_type flat) it is an exact flat index.
+    """
+    import faiss
+
+    index_config = _index_config(index_config)
+    index_type = index_config.get("index_type", "flat")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported faiss_db.index_type: {index_type}")
+    count, dimension = vectors.shape
+    if count < index_config.get("train_threshold", 10_000):
+        index_type = "flat"
+
+    spec, params = _factory_spec(index_type, dimension, count, index_config)
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = index_config.get("hnsw", {}).get("ef_construction", 64)
+    if not index.is_trained:
+        sample = vectors
+        if count > _MAX_TRAINING_POINTS:
+            sample = vectors[np.random.default_rng(0).choice(count, _MAX_TRAINING_POINTS, replace=False)]
+        index.train(sample)
+    params.update(prepare_index(index, index_config))
+    log.info("FAISS index built", index_type=index_type, spec=spec, vectors=count, **params)
+    return index
+
+
+@lru_cache(maxsize=None)
+def _vectorstore_class():
+    """
+    LangChain's FAISS vectorstore with delete() refused up front. FAISS ids are
+    positions shared by the index, the docstore and the BM25 index, and LangChain's
+    delete removes vectors before docstore rows and renumbers only its own id map,
+    so a session index is rebuilt by re-ingesting instead.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    class SessionFAISS(FAISS):
+        def delete(self, ids: Optional[List[str]] = None, **kwargs) -> Optional[bool]:
+            raise NotImplementedError("Session indexes do not support deleting chunks; "
+                                      "re-ingest the remaining documents into a new session")
+
+    return SessionFAISS
+
+
+def build_vectorstore(text_embeddings: List[tuple], embeddings, metadatas: Optional[List[dict]] = None,
+                      index_config: Optional[dict] = None):
+    """FAISS vectorstore over (text, vector) pairs, using the index type selected in faiss_db."""
+    FAISS = _vectorstore_class()
+    vectors = np.asarray([vector for _, vector in text_embeddings], dtype=np.float32)
+    vectorstore = FAISS(embedding_function=embeddings, index=build_index(vectors, index_config),
+                        docstore=SQLiteDocstore(), index_to_docstore_id=FaissIdMap())
+    add_embeddings(vectorstore, text_embeddings, metadatas)
+    return vectorstore
+
+
+def add_embeddings(vectorstore, text_embeddings: List[tuple], metadatas: Optional[List[dict]] = None) -> List[str]:
+    """
+    Append (text, vector) pairs to a vectorstore built or loaded here. Chunks are
+    keyed by their FAISS id in the docstore, so the ids are assigned positionally.
+    """
+    start = vectorstore.index.ntotal
+    ids = [str(start + i) for i in range(len(text_embeddings))]
+    return vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+
+def get_documents(vectorstore, faiss_ids: List[int]) -> List:
+    """Documents for FAISS ids, in order, skipping missing ones; one docstore read when it supports mget."""
+    docstore_ids = [vectorstore.index_to_docstore_id[i] for i in faiss_ids]
+    if hasattr(vectorstore.docstore, "mget"):
+        docs = vectorstore.docstore.mget(docstore_ids)
+    else:
+        docs = [vectorstore.docstore.search(docstore_id) for docstore_id in docstore_ids]
+    return [doc for doc in docs if isinstance(doc, Document)]
+
+
+def upgrade_index(vectorstore, index_config: Optional[dict] = None) -> bool:
+    """
+    Retrain a flat index into the configured index type once appends have grown it
+    past train_threshold. Vectors keep their ids, so the docstore mapping and the
+    BM25 index stay valid. Returns True if the index was rebuilt.
+    """
+    index_config = _index_config(index_config)
+    index = vectorstore.index
+    if (index_type_of(index) != "flat" or index_config.get("index_type", "flat") == "flat"
+            or index.ntotal < index_config.get("train_threshold", 10_000)):
+        return False
+    vectors = index.reconstruct_n(0, index.ntotal)
+    upgraded = build_index(vectors, index_config)
+    upgraded.add(vectors)
+    vectorstore.index = upgraded
+    log.info("Flat FAISS index retrained", index_type=index_type_of(upgraded), vectors=upgraded.ntotal)
+    return True
+
+
+def _index_meta(index) -> dict:
+    """Contents of index_meta.json, which records how the saved index was built."""
+    return {"index_type": index_type_of(index), "dimension": index.d, "ntotal": index.ntotal}
+
+
+def _read_meta(index_dir) -> dict:
+    meta_path = Path(index_dir) / _META_FILE
+    return json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.is_file() else {}
+
+
+def _mmap_flags(index_type: Optional[str]) -> int:
+    """
+    Read-only mmap flags for an index type: IVF indexes map their inverted lists,
+    the others (flat, HNSW, PQ) their code arrays. FAISS rejects the combination.
+    """
+    import faiss
+
+    if index_type in ("ivf", "ivfpq"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def _read_index(index_dir, index_type: Optional[str]):
+    import faiss
+
+    path = str(Path(index_dir) / _INDEX_FILE)
+    try:
+        return faiss.read_index(path, _mmap_flags(index_type))
+    except RuntimeError as e:
+        log.warning("Memory-mapped FAISS load failed, reading into memory", index_path=str(index_dir), error=str(e))
+        return faiss.read_index(path)
+
+
+def load_vectorstore(index_dir, embeddings, index_config: Optional[dict] = None, mmap: bool = False):
+    """
+    Load a FAISS vectorstore saved by save_vectorstore, restoring its index type
+    settings. Only the vectors are read; chunk text stays in the on-disk docstore
+    and is read per hit. With mmap=True the vectors are memory-mapped read-only
+    instead of read into memory; such a vectorstore can be searched but not appended to.
+    """
+    import faiss
+
+    FAISS = _vectorstore_class()
+    index_dir = Path(index_dir)
+    if not (index_dir / DOCSTORE_FILE).is_file():
+        raise FileNotFoundError(f"No {DOCSTORE_FILE} in {index_dir}; indexes saved before it must be re-ingested")
+    meta = _read_meta(index_dir)
+    index = _read_index(index_dir, meta.get("index_type")) if mmap else faiss.read_index(str(index_dir / _INDEX_FILE))
+    vectorstore = FAISS(embedding_function=embeddings, index=index, docstore=SQLiteDocstore(index_dir / DOCSTORE_FILE),
+                        index_to_docstore_id=FaissIdMap(index.ntotal))
+    if meta and meta.get("index_type") != index_type_of(vectorstore.index):
+        log.warning("FAISS index type differs from its metadata", index_path=str(index_dir),
+                    recorded=meta.get("index_type"), actual=index_type_of(vectorstore.index))
+    prepare_index(vectorstore.index, index_config)
+    return vectorstore
+
+
+def save_vectorstore(vectorstore, index_dir, sidecars: Optional[dict] = None) -> None:
+    """
+    Save a vectorstore atomically: write into a sibling temp directory, then swap it
+    into place with two renames, so an index is never seen half-written. Between the
+    renames index_dir is briefly missing; readers that may race a save go through
+    read_saved_index, which waits for the swap to finish. sidecars maps file names
+    to objects with a save(path) method (e.g. the BM25 index) that are written into
+    the same directory and swapped together with the vectors, docstore and
+    index_meta.json. Afterwards the vectorstore reads its chunks from the saved docstore.
+    index_dir is replaced as a whole, so it must hold nothing but one index: a
+    directory with subdirectories (e.g. the base directory of the session indexes)
+    is refused.
+    """
+    import faiss
+
+    if not isinstance(vectorstore.docstore, SQLiteDocstore):
+        raise TypeError("save_vectorstore expects a vectorstore from build_vectorstore or load_vectorstore")
+    index_dir = Path(index_dir)
+    if index_dir.is_dir() and any(entry.is_dir() for entry in index_dir.iterdir()):
+        raise ValueError(f"{index_dir} contains subdirectories; save each index into a directory of its own")
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = index_dir.with_name(f".{index_dir.name}.tmp-{uuid.uuid4().hex[:8]}")
+    backup_dir = index_dir.with_name(f".{index_dir.name}.old-{uuid.uuid4().hex[:8]}")
+    try:
+        tmp_dir.mkdir()
+        faiss.write_index(vectorstore.index, str(tmp_dir / _INDEX_FILE))
+        vectorstore.docstore.save(tmp_dir / DOCSTORE_FILE)
+        (tmp_dir / _META_FILE).write_text(json.dumps(_index_meta(vectorstore.index)), encoding="utf-8")
+        for file_name, sidecar in (sidecars or {}).items():
+            sidecar.save(tmp_dir / file_name)
+        if index_dir.exists():
+            os.replace(index_dir, backup_dir)
+        os.replace(tmp_dir, index_dir)
+    except Exception:
+        # restore the previous index if the swap did not complete
+        if backup_dir.exists() and not index_dir.exists():
+            os.replace(backup_dir, index_dir)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    vectorstore.docstore.attach(index_dir / DOCSTORE_FILE)
+    log.info("FAISS index saved atomically", index_path=str(index_dir))
@@ -0,0 +1,101 @@
+import io
+import threading
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.documents import Document
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def read_upload(uploaded_file) -> bytes:
+    """
+    Return the content of an uploaded file without copying it where possible.
+    BytesIO-backed uploads (Streamlit's UploadedFile) hand back their internal
+    bytes object from getvalue(), so no extra copy of the upload is made.
+    """
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    if hasattr(uploaded_file, "getbuffer"):
+        return bytes(uploaded_file.getbuffer())
+    return uploaded_file.read()
+
+
+def write_buffer(data, path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Path:
+    """Write a buffer to disk in fixed-size chunks, slicing it without copies."""
+    path = Path(path)
+    view = memoryview(data)
+    with open(path, "wb") as f_out:
+        for offset in range(0, len(view), chunk_size):
+            f_out.write(view[offset:offset + chunk_size])
+    return path
+
+
+def _get_writer() -> ThreadPoolExecutor:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-writer")
+        return _writer
+
+
+def write_buffer_async(data, path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Future:
+    """
+    Schedule a chunked write on the background writer so persisting an upload
+    stays off the request path. Failures are logged when the write completes.
+    """
+    future = _get_writer().submit(write_buffer, data, path, chunk_size)
+
+    def _report(done: Future):
+        if done.exception() is not None:
+            log.error("Background upload write failed", path=str(path), error=str(done.exception()))
+        else:
+            log.info("Background upload write completed", path=str(path), size=len(data))
+
+    future.add_done_callback(_report)
+    return future
+
+
+def unique_name(name: str, taken: set) -> str:
+    """
+    name, or name with a " (n)" suffix before the extension if it is already in
+    taken, so uploads that share a file name are kept apart. The result is added
+    to taken.
+    """
+    path = Path(name)
+    candidate, n = name, 2
+    while candidate in taken:
+        candidate = f"{path.stem} ({n}){path.suffix}"
+        n += 1
+    taken.add(candidate)
+    return candidate
+
+
+def load_documents_from_bytes(data: bytes, ext: str, file_name: str, source: str | None = None) -> list:
+    """
+    Build documents straight from an upload's bytes, mirroring the metadata the
+    path-based loaders (PyPDFLoader, Docx2txtLoader, TextLoader) produce. source
+    defaults to file_name; pass the upload's unique saved path so documents from
+    uploads with the same name stay distinct.
+    """
+    source = source or file_name
+    if ext == ".pdf":
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return [
+            Document(page_content=page.extract_text() or "", metadata={"source": source, "page": page_num})
+            for page_num, page in enumerate(reader.pages)
+        ]
+    if ext == ".docx":
+        import docx2txt
+
+        return [Document(page_content=docx2txt.process(io.BytesIO(data)), metadata={"source": source})]
+    if ext in (".txt", ".md"):
+        return [Document(page_content=data.decode("utf-8"), metadata={"source": source})]
+    raise ValueError(f"Unsupported file type: {ext}")
@@ -0,0 +1,112 @@
+"""
+Import-time benchmark for the portal entry points.
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`
+and its cumulative import time is compared with the startup budget
+(startup.import_budget_ms in config.yaml, or --budget-ms).
+
+Usage:
+    python -m utils.import_benchmark [--budget-ms 1500] [--json results.json]
+
+Exits with status 1 if any entry point fails to import or goes over budget.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from utils.config_loader import load_config
+
+ENTRY_POINTS = [
+    "utils.model_loader",
+    "src.document_analyzer.data_ingestion",
+    "src.document_analyzer.data_analysis",
+    "src.document_compare.data_ingestion",
+    "src.document_compare.document_compare",
+    "src.single_document_chat.data_ingestion",
+    "src.single_document_chat.retrieval",
+    "src.multi_document_chat.data_ingestion",
+    "src.multi_document_chat.retrieval",
+]
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+_IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def measure_import(module: str) -> dict:
+    """
+    Import one module in a fresh interpreter and return its cumulative import time
+    in milliseconds, together with its five heaviest dependencies.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+    )
+    timings = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            timings[match.group(4)] = int(match.group(2)) / 1000
+
+    heaviest = sorted(
+        ((name, ms) for name, ms in timings.items() if name != module),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:5]
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {
+        "module": module,
+        "import_ms": timings.get(module),
+        "heaviest": [{"module": name, "import_ms": ms} for name, ms in heaviest],
+        "error": error,
+    }
+
+
+def run_benchmark(budget_ms: float, entry_points=ENTRY_POINTS) -> list:
+    results = []
+    for module in entry_points:
+        result = measure_import(module)
+        result["budget_ms"] = budget_ms
+        result["ok"] = result["error"] is None and result["import_ms"] is not None and result["import_ms"] <= budget_ms
+        results.append(result)
+    return results
+
+
+def main(argv=None) -> int:
+    config = load_config(str(PROJECT_ROOT / "config" / "config.yaml"))
+    parser = argparse.ArgumentParser(description="Measure cold import time of the portal entry points.")
+    parser.add_argument("--budget-ms", type=float, default=config.get("startup", {}).get("import_budget_ms", 1500))
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("modules", nargs="*", help="entry points to measure (default: all)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.budget_ms, args.modules or ENTRY_POINTS)
+    for result in results:
+        status = "OK  " if result["ok"] else "FAIL"
+        timing = f"{result['import_ms']:9.1f} ms" if result["import_ms"] is not None else "      n/a   "
+        print(f"{status} {timing}  {result['module']}")
+        if result["error"]:
+            print(f"       error: {result['error']}")
+        elif not result["ok"]:
+            for dep in result["heaviest"]:
+                print(f"       {dep['import_ms']:9.1f} ms  {dep['module']}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    failed = [r["module"] for r in results if not r["ok"]]
+    if failed:
+        print(f"{len(failed)} entry point(s) over the {args.budget_ms:.0f} ms startup budget or failing to import")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+from typing import Any, List, Sequence
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from utils.faiss_store import get_documents
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def maximal_marginal_relevance(query_vector: Sequence[float], candidate_vectors: np.ndarray,
+                               k: int = 10, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Pick k candidates that are relevant to the query but not to each other.
+    Query relevance is computed for all candidates in one matrix product; each
+    greedy step then costs a single matrix-vector product against the last pick.
+    Returns candidate positions in selection order.
+    """
+    candidates = _normalize_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    if candidates.ndim != 2 or len(candidates) == 0 or k <= 0:
+        return []
+    query = _normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+    relevance = candidates @ query
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, candidates @ candidates[pick], out=redundancy)
+    return selected
+
+
+def reconstruct_vectors(index, ids: Sequence[int]) -> np.ndarray:
+    """Read stored vectors back out of a FAISS index, so candidates are never re-embedded."""
+    ids = np.asarray(ids, dtype=np.int64)
+    try:
+        return index.reconstruct_batch(ids)
+    except (AttributeError, RuntimeError):
+        return np.vstack([index.reconstruct(int(i)) for i in ids])
+
+
+class MMRRetriever(BaseRetriever):
+    """
+    Maximal-marginal-relevance retriever over a LangChain FAISS vectorstore.
+    Fetches fetch_k nearest chunks, then reranks them with MMR using the vectors
+    already stored in the index, so overlapping near-duplicate chunks do not
+    crowd out the rest of the context.
+    """
+    vectorstore: Any
+    k: int = 10
+    fetch_k: int = 40
+    lambda_mult: float = 0.5
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        embeddings = self.vectorstore.embeddings
+        vector = embeddings.embed_query(query) if embeddings is not None else self.vectorstore.embedding_function(query)
+        return np.asarray(vector, dtype=np.float32).reshape(1, -1)
+
+    def search_ids(self, query: str) -> List[int]:
+        """FAISS ids of the selected chunks, in MMR order."""
+        index = self.vectorstore.index
+        if index.ntotal == 0:
+            return []
+        query_vector = self._embed_query(query)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            query_vector = _normalize_rows(query_vector)
+        _, ids = index.search(query_vector, min(max(self.fetch_k, self.k), index.ntotal))
+        candidate_ids = [int(i) for i in ids[0] if i != -1]
+        if not candidate_ids:
+            return []
+        selected = maximal_marginal_relevance(query_vector[0], reconstruct_vectors(index, candidate_ids),
+                                              k=self.k, lambda_mult=self.lambda_mult)
+        return [candidate_ids[i] for i in selected]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return get_documents(self.vectorstore, self.search_ids(query))
@@ -1,52 +1,122 @@
 import os
 import sys
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from utils.config_loader import load_config
+from utils.config_loader import load_config, clear_config_cache
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 
 log = CustomLogger().get_logger(__name__)
 
+# API key each provider needs; the offline "fake" provider needs none
+_PROVIDER_KEYS = {"google": "GOOGLE_API_KEY", "groq": "GROQ_API_KEY"}
+
 
 class Model_Loader:
     """
     A Utility class for loading embedding and LLM models.
+    LLM and embedding clients are shared process-wide: every Model_Loader returns the
+    same instance for the same provider, model and parameters, so HTTP connection
+    pools are reused. Call Model_Loader.invalidate() after changing the config.
+    Providers are chosen by config.yaml, overridable with the LLM_PROVIDER and
+    EMBEDDING_PROVIDER env vars; "fake" selects deterministic offline models.
     """
+    _registry = {}
+    _lock = threading.RLock()
+    _env_loaded = False
+
     def __init__(self):
         
-        load_dotenv()
-        self._validate_env()
+        with Model_Loader._lock:
+            if not Model_Loader._env_loaded:
+                load_dotenv()
+                Model_Loader._env_loaded = True
         self.config = load_config()
+        self._validate_env()
         log.info("Configuration loaded successfully.", config_keys=list(self.config.keys()))
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop all shared clients and the cached config, so the next load re-reads
+        .env and config.yaml and builds fresh clients.
+        """
+        with cls._lock:
+            cls._registry.clear()
+            cls._env_loaded = False
+            clear_config_cache()
+        log.info("Model registry invalidated")
+
+    def _get_or_create(self, key: tuple, factory):
+        with Model_Loader._lock:
+            if key not in Model_Loader._registry:
+                Model_Loader._registry[key] = factory()
+                log.info("Model client created", key=[str(k) for k in key])
+            return Model_Loader._registry[key]
         
     def _validate_env(self):
         """Validates the environment variables required for model loading.
            Ensure api keys exist.
         """
-        reqd_variables = ["GOOGLE_API_KEY","GROQ_API_KEY"]
-        self.api_keys = {var:os.getenv(var) for var in reqd_variables}
-        missing = [k for k,v in self.api_keys.items() if not v]
+        self.api_keys = {var:os.getenv(var) for var in _PROVIDER_KEYS.values()}
+        llm_provider = self.config["llm"].get(self._llm_provider_key(), {}).get("provider")
+        reqd_variables = {_PROVIDER_KEYS[p] for p in (self._embedding_provider(), llm_provider) if p in _PROVIDER_KEYS}
+        missing = [k for k in sorted(reqd_variables) if not self.api_keys[k]]
         
         if missing:
             log.error("Missing env variables", missing_vars= missing)
             raise DocumentPortalException("Missing env variables", sys)
         log.info("Env variable validated successfully.", available_keys= [k for k in self.api_keys.keys() if self.api_keys[k]])
 
+    def _embedding_provider(self) -> str:
+        return os.getenv("EMBEDDING_PROVIDER", self.config["embedding_model"].get("provider", "google"))
+
+    @staticmethod
+    def _llm_provider_key() -> str:
+        return os.getenv("LLM_PROVIDER", "groq")  # Default groq
+
+    def llm_settings(self) -> dict:
+        """Config block of the LLM provider in use (llm.<LLM_PROVIDER> in config.yaml)."""
+        return self.config["llm"].get(self._llm_provider_key(), {})
+
     def load_embeddings(self):
         """
             Load and return embedding model.
         """
         try:
             log.info("Loading embeddings model...")
+            if self._embedding_provider() == "fake":
+                from utils.fake_models import HashingEmbeddings
+
+                dimensions = self.config["embedding_model"].get("fake_dimensions", 256)
+                return self._get_or_create(("embeddings", "fake", dimensions), lambda: HashingEmbeddings(dimensions))
             model_name = self.config["embedding_model"]["model_name"]
-            return GoogleGenerativeAIEmbeddings(model=model_name)
+            cache_config = self.config.get("embedding_cache", {})
+            key = ("embeddings", self.config["embedding_model"].get("provider", "google"), model_name,
+                   tuple(sorted(cache_config.items())))
+            return self._get_or_create(key, lambda: self._create_embeddings(model_name, cache_config))
             
         except Exception as e:
             log.error("Error loading embeddings model", error=str(e))
             raise DocumentPortalException("Error loading embeddings model", sys)
         
+    def _create_embeddings(self, model_name, cache_config):
+        # provider SDKs are imported only when the provider is actually used
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(model=model_name)
+        if cache_config.get("enabled", False):
+            from utils.embedding_cache import CachedEmbeddings
+
+            embeddings = CachedEmbeddings(
+                embeddings,
+                model_name=model_name,
+                cache_path=cache_config.get("cache_path", "cache/embeddings.sqlite"),
+                max_entries=cache_config.get("max_entries", 200_000),
+            )
+            log.info("Embedding cache enabled", model=model_name)
+        return embeddings
+
     def load_llm(self):
         """
         Load and return the LLM model.
@@ -57,7 +127,7 @@ class Model_Loader:
 
         log.info("Loading LLM...")
         
-        provider_key = os.getenv("LLM_PROVIDER", "groq")  # Default groq
+        provider_key = self._llm_provider_key()
         if provider_key not in llm_block:
             log.error("LLM provider not found in config", provider_key=provider_key)
             raise ValueError(f"Provider '{provider_key}' not found in config")
@@ -70,21 +140,26 @@ class Model_Loader:
         
         log.info("Loading LLM", provider=provider, model=model_name, temperature=temperature, max_tokens=max_tokens)
 
+        key = ("llm", provider, model_name, temperature, max_tokens)
         if provider == "google":
-            llm=ChatGoogleGenerativeAI(
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return self._get_or_create(key, lambda: ChatGoogleGenerativeAI(
                 model=model_name,
                 temperature=temperature,
                 max_output_tokens=max_tokens
-            )
-            return llm
+            ))
 
         elif provider == "groq":
-            llm=ChatGroq(
+            from langchain_groq import ChatGroq
+            return self._get_or_create(key, lambda: ChatGroq(
                 model=model_name,
                 api_key=self.api_keys["GROQ_API_KEY"],
                 temperature=temperature,
-            )
-            return llm
+            ))
+
+        elif provider == "fake":
+            from utils.fake_models import EchoChatModel
+            return self._get_or_create(key, EchoChatModel)
             
         # elif provider == "openai":
         #     return ChatOpenAI(
@@ -0,0 +1,89 @@
+import re
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from utils.config_loader import load_config
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+# words and openers that usually point back into the conversation
+_REFERENCES = re.compile(
+    r"\b(it|its|they|them|their|theirs|this|that|these|those|he|him|his|she|her|hers|"
+    r"former|latter|above|previous|earlier|same|again|else|other|another)\b",
+    re.IGNORECASE,
+)
+_FOLLOW_UP_OPENERS = re.compile(r"^\s*(and|but|also|so|then|what about|how about|why not|ok|okay)\b", re.IGNORECASE)
+_NON_WORD = re.compile(r"\W+")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+        return _executor
+
+
+def needs_rewrite(question: str, chat_history: Optional[list], min_words: int = 4) -> bool:
+    """
+    Cheap local check whether a question depends on the conversation. Without
+    history, or when the question is long enough and has no references back into
+    the conversation, it is already standalone.
+    """
+    if not chat_history:
+        return False
+    if len(_NON_WORD.sub(" ", question).split()) < min_words:
+        return True
+    return bool(_FOLLOW_UP_OPENERS.match(question) or _REFERENCES.search(question))
+
+
+def same_question(a: str, b: str) -> bool:
+    """True if two questions differ only in case, whitespace or punctuation."""
+    return _NON_WORD.sub(" ", a).strip().lower() == _NON_WORD.sub(" ", b).strip().lower()
+
+
+class QueryRouter:
+    """
+    Decides whether a question goes through the contextualize (rewrite) LLM call
+    before retrieval. When a rewrite is needed, retrieval for the raw question starts
+    speculatively in parallel, and its result is kept if the rewrite comes back unchanged.
+    """
+    def __init__(self, rewrite: Callable[[str, list], str], retrieve: Callable[[str], list],
+                 enabled: Optional[bool] = None, speculative: Optional[bool] = None, min_words: Optional[int] = None):
+        routing_config = load_config().get("query_routing", {})
+        self.rewrite = rewrite
+        self.retrieve = retrieve
+        self.enabled = routing_config.get("enabled", True) if enabled is None else enabled
+        self.speculative = routing_config.get("speculative_retrieval", True) if speculative is None else speculative
+        self.min_words = routing_config.get("min_words", 4) if min_words is None else min_words
+
+    def resolve(self, question: str, chat_history: Optional[list]) -> Tuple[str, Optional[Future], str]:
+        """
+        Return the standalone question, a pending retrieval for it if one is already
+        running (or None), and the route taken: "skipped", "speculative_hit" or "rewritten".
+        """
+        if self.enabled and not needs_rewrite(question, chat_history, self.min_words):
+            return question, None, "skipped"
+
+        # run in a copy of this context, so the retriever sees the calling run's
+        # LangChain config and callbacks (tracing) like the rewrite does
+        pending = _get_executor().submit(contextvars.copy_context().run, self.retrieve, question) if self.speculative else None
+        standalone = self.rewrite(question, chat_history or [])
+        if pending is not None and same_question(standalone, question):
+            return question, pending, "speculative_hit"
+        if pending is not None:
+            # too late to stop it if already running; its result is simply discarded
+            pending.cancel()
+        return standalone, None, "rewritten"
+
+    def route(self, question: str, chat_history: Optional[list]) -> Tuple[str, List]:
+        """Resolve the standalone question and return it with its retrieved documents."""
+        standalone, pending, route = self.resolve(question, chat_history)
+        docs = pending.result() if pending is not None else self.retrieve(standalone)
+        log.info("Query routed", route=route, rewritten=not same_question(standalone, question))
+        return standalone, docs
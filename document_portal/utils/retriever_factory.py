@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import Optional
+from utils.config_loader import load_config
+from logger.custom_logger import CustomLogger
+from utils.mmr import MMRRetriever
+from utils.bm25 import BM25Index, HybridRetriever
+
+log = CustomLogger().get_logger(__name__)
+
+
+def hybrid_enabled(retriever_config: Optional[dict] = None) -> bool:
+    retriever_config = load_config().get("retriever", {}) if retriever_config is None else retriever_config
+    return bool(retriever_config.get("hybrid", False))
+
+
+def load_lexical_index(vectorstore, index_dir=None) -> BM25Index:
+    """
+    BM25 index saved next to the FAISS index, or one rebuilt from the docstore if
+    it is missing or out of step with the vectors (e.g. an index saved before
+    hybrid retrieval was enabled).
+    """
+    if index_dir is not None:
+        path = Path(index_dir) / BM25Index.FILE_NAME
+        if path.is_file():
+            lexical_index = BM25Index.load(path)
+            if len(lexical_index) == vectorstore.index.ntotal:
+                return lexical_index
+            log.warning("BM25 index out of step with FAISS index, rebuilding", index_path=str(index_dir),
+                        bm25_docs=len(lexical_index), faiss_vectors=vectorstore.index.ntotal)
+    return BM25Index.from_vectorstore(vectorstore)
+
+
+def build_retriever(vectorstore, retriever_config: Optional[dict] = None, index_dir=None,
+                    lexical_index: Optional[BM25Index] = None):
+    """
+    Build the retriever selected by the retriever block in config.yaml:
+    "mmr" (default) reranks fetch_k candidates with maximal marginal relevance,
+    "similarity" returns the plain top_k nearest chunks. With hybrid enabled, its
+    hits are fused with BM25 hits from the lexical index saved in index_dir.
+    """
+    retriever_config = load_config().get("retriever", {}) if retriever_config is None else retriever_config
+    search_type = retriever_config.get("search_type", "mmr")
+    top_k = retriever_config.get("top_k", 10)
+    if search_type == "mmr":
+        retriever = MMRRetriever(
+            vectorstore=vectorstore,
+            k=top_k,
+            fetch_k=retriever_config.get("fetch_k", 4 * top_k),
+            lambda_mult=retriever_config.get("lambda_mult", 0.5),
+        )
+    elif search_type == "similarity":
+        retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": top_k})
+    else:
+        raise ValueError(f"Unsupported retriever search_type: {search_type}")
+
+    if not hybrid_enabled(retriever_config):
+        return retriever
+    return HybridRetriever(
+        vectorstore=vectorstore,
+        vector_retriever=retriever,
+        lexical_index=lexical_index if lexical_index is not None else load_lexical_index(vectorstore, index_dir),
+        k=top_k,
+        lexical_k=retriever_config.get("lexical_k", 2 * top_k),
+        rrf_k=retriever_config.get("rrf_k", 60),
+    )
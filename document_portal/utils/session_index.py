@@ -0,0 +1,143 @@
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
+from utils.config_loader import load_config
+from utils.docstore import DOCSTORE_FILE
+from utils.faiss_store import load_vectorstore, read_saved_index
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+
+class SessionIndex:
+    """One open session vectorstore, plus objects derived from it (e.g. its retriever)."""
+    def __init__(self, session_id: str, index_dir: Path, vectorstore, fingerprint, resident_bytes: int):
+        self.session_id = session_id
+        self.index_dir = index_dir
+        self.vectorstore = vectorstore
+        self.fingerprint = fingerprint
+        self.resident_bytes = resident_bytes
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derive(self, name: str, factory: Callable):
+        """Build factory(vectorstore) once per open index and share it between callers."""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = factory(self.vectorstore)
+            return self._derived[name]
+
+
+class SessionIndexManager:
+    """
+    Keeps recently used session indexes open, so requests do not reload them.
+    Indexes are opened memory-mapped and read-only, so the vectors stay in the page
+    cache instead of each process's heap. Open indexes are kept least recently used
+    by session_id, bounded by max_sessions and by memory_budget_mb of resident data
+    (sidecars, plus the vectors when not memory-mapped; chunk text is read from the
+    on-disk docstore per hit). Concurrent
+    requests for the same session share one load and one instance; an index that
+    was rebuilt on disk is reopened on its next use.
+    """
+    def __init__(self, max_sessions: int = 32, memory_budget_mb: float = 1024, mmap: bool = True):
+        self.max_sessions = max_sessions
+        self.memory_budget_bytes = int(memory_budget_mb * 2**20)
+        self.mmap = mmap
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _resident_bytes(self, index_dir: Path) -> int:
+        return sum(
+            f.stat().st_size for f in index_dir.iterdir()
+            if f.is_file() and f.name != DOCSTORE_FILE and not (self.mmap and f.name == "index.faiss")
+        )
+
+    def get(self, session_id: str, index_dir, embeddings) -> SessionIndex:
+        """Open session index for index_dir, loading it only if it is not already open and current."""
+        index_dir = Path(index_dir).resolve()
+        fingerprint, _ = read_saved_index(index_dir)
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.index_dir == index_dir and entry.fingerprint == fingerprint:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return entry
+            pending = self._loading.get(session_id)
+            owner = pending is None
+            if owner:
+                pending = self._loading[session_id] = Future()
+        if not owner:
+            return pending.result()
+
+        try:
+            # the fingerprint is taken again with the load: the index may have been saved since
+            fingerprint, (vectorstore, resident_bytes) = read_saved_index(
+                index_dir, lambda d: (load_vectorstore(d, embeddings, mmap=self.mmap), self._resident_bytes(d))
+            )
+            entry = SessionIndex(session_id, index_dir, vectorstore, fingerprint, resident_bytes)
+            pending.set_result(entry)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(session_id, None)
+
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            self.loads += 1
+            self._evict()
+        log.info("Session index opened", session_id=session_id, index_path=str(index_dir), mmap=self.mmap,
+                 vectors=vectorstore.index.ntotal, resident_mb=round(entry.resident_bytes / 2**20, 2),
+                 open_sessions=len(self._entries))
+        return entry
+
+    def _evict(self) -> None:
+        # the most recently used index always stays, even if it alone is over budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_sessions or self.resident_bytes() > self.memory_budget_bytes
+        ):
+            session_id, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            log.info("Session index evicted", session_id=session_id)
+
+    def resident_bytes(self) -> int:
+        return sum(entry.resident_bytes for entry in self._entries.values())
+
+    def invalidate(self, session_id: Optional[str] = None) -> None:
+        """Close one session's index, or all of them. Callers still holding it keep a working copy."""
+        with self._lock:
+            if session_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"open_sessions": len(self._entries), "resident_mb": round(self.resident_bytes() / 2**20, 2),
+                    "hits": self.hits, "loads": self.loads, "evictions": self.evictions}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_index_manager() -> SessionIndexManager:
+    """Process-wide session index manager from the session_index block in config.yaml."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            index_config = load_config().get("session_index", {})
+            _manager = SessionIndexManager(
+                max_sessions=index_config.get("max_sessions", 32),
+                memory_budget_mb=index_config.get("memory_budget_mb", 1024),
+                mmap=index_config.get("mmap", True),
+            )
+        return _manager
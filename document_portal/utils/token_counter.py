@@ -0,0 +1,22 @@
+import re
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate LLM token count without a tokenizer dependency: one token per
+    punctuation mark and per word, plus one for every further six characters of
+    a long word, which tracks BPE tokenizers closely enough for budgeting.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECES.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text, cut at a piece boundary, that count_tokens() puts within max_tokens."""
+    used = 0
+    for match in _PIECES.finditer(text):
+        used += 1 + (len(match.group()) - 1) // 6
+        if used > max_tokens:
+            return text[:match.start()].rstrip()
+    return text
@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from utils.config_loader import load_config
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+# latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# numeric span attributes that are also exported as per-stage counters
+COUNTED_ATTRS = ("files", "documents", "pages", "chunks", "input_tokens", "output_tokens", "total_tokens")
+
+
+class _StageStats:
+    def __init__(self, buckets, reservoir_size):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=reservoir_size)
+        self.counters = defaultdict(float)
+
+
+class Tracer:
+    """
+    Records latency spans for pipeline stages without any external collector.
+    Every span is appended to a local JSONL trace file, and per-stage histograms
+    (with p50/p95/p99 over the most recent samples) are exported to a
+    Prometheus text-format metrics file.
+    """
+    def __init__(self, trace_path: str = "traces/trace.jsonl", metrics_path: str = "traces/metrics.prom",
+                 enabled: bool = True, export_interval_s: float = 10.0,
+                 buckets=DEFAULT_BUCKETS, reservoir_size: int = 10_000):
+        self.enabled = enabled
+        self.trace_path = Path(trace_path)
+        self.metrics_path = Path(metrics_path)
+        self.export_interval_s = export_interval_s
+        self.buckets = tuple(buckets)
+        self.reservoir_size = reservoir_size
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._last_export = 0.0
+
+    @contextmanager
+    def span(self, stage: str, session_id: Optional[str] = None, **attrs):
+        """
+        Time a block of work as one stage. The yielded dict can be filled with
+        extra attributes (e.g. chunk or token counts) before the block ends.
+        """
+        if not self.enabled:
+            yield attrs
+            return
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield attrs
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, session_id=session_id, status=status, **attrs)
+
+    def record(self, stage: str, duration_ms: float, session_id: Optional[str] = None, status: str = "ok", **attrs):
+        """Record an already-measured stage duration."""
+        if not self.enabled:
+            return
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "stage": stage,
+            "session_id": session_id,
+            "duration_ms": round(duration_ms, 3),
+            "status": status,
+            **attrs,
+        }
+        seconds = duration_ms / 1000
+        try:
+            with self._lock:
+                stats = self._stats.get(stage)
+                if stats is None:
+                    stats = self._stats[stage] = _StageStats(self.buckets, self.reservoir_size)
+                stats.count += 1
+                stats.total += seconds
+                stats.samples.append(seconds)
+                if status != "ok":
+                    stats.errors += 1
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        stats.bucket_counts[i] += 1
+                for name in COUNTED_ATTRS:
+                    if isinstance(attrs.get(name), (int, float)):
+                        stats.counters[name] += attrs[name]
+
+                if self._trace_file is None:
+                    self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._trace_file = open(self.trace_path, "a", encoding="utf-8", buffering=1)
+                self._trace_file.write(json.dumps(entry, default=str) + "\n")
+
+            if time.monotonic() - self._last_export >= self.export_interval_s:
+                self.export_metrics()
+        except Exception as e:
+            # tracing must never break the request it observes
+            log.warning("Failed to record trace span", stage=stage, error=str(e))
+
+    @staticmethod
+    def _quantile(sorted_samples, q: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        index = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+        return sorted_samples[index]
+
+    def quantiles(self, stage: str) -> dict:
+        """Return {0.5: p50, 0.95: p95, 0.99: p99} in seconds for one stage."""
+        with self._lock:
+            stats = self._stats.get(stage)
+            samples = sorted(stats.samples) if stats else []
+        return {q: self._quantile(samples, q) for q in QUANTILES}
+
+    def snapshot(self) -> dict:
+        """Cumulative {stage: {"count", "total_seconds", "errors", <counters>}} so far."""
+        with self._lock:
+            return {
+                stage: {"count": stats.count, "total_seconds": stats.total, "errors": stats.errors, **stats.counters}
+                for stage, stats in self._stats.items()
+            }
+
+    def render_metrics(self) -> str:
+        """Render all stage metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP document_portal_stage_duration_seconds Latency of pipeline stages.",
+            "# TYPE document_portal_stage_duration_seconds histogram",
+        ]
+        summary = [
+            "# HELP document_portal_stage_latency_seconds Latency quantiles over the most recent spans.",
+            "# TYPE document_portal_stage_latency_seconds summary",
+        ]
+        counters = [
+            "# HELP document_portal_stage_items_total Items processed per stage (chunks, tokens, ...).",
+            "# TYPE document_portal_stage_items_total counter",
+        ]
+        errors = [
+            "# HELP document_portal_stage_errors_total Failed spans per stage.",
+            "# TYPE document_portal_stage_errors_total counter",
+        ]
+        with self._lock:
+            for stage in sorted(self._stats):
+                stats = self._stats[stage]
+                label = f'stage="{stage}"'
+                for bound, count in zip(self.buckets, stats.bucket_counts):
+                    lines.append(f'document_portal_stage_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'document_portal_stage_duration_seconds_bucket{{{label},le="+Inf"}} {stats.count}')
+                lines.append(f"document_portal_stage_duration_seconds_sum{{{label}}} {stats.total:.6f}")
+                lines.append(f"document_portal_stage_duration_seconds_count{{{label}}} {stats.count}")
+
+                samples = sorted(stats.samples)
+                for q in QUANTILES:
+                    summary.append(f'document_portal_stage_latency_seconds{{{label},quantile="{q}"}} {self._quantile(samples, q):.6f}')
+                summary.append(f"document_portal_stage_latency_seconds_sum{{{label}}} {stats.total:.6f}")
+                summary.append(f"document_portal_stage_latency_seconds_count{{{label}}} {stats.count}")
+
+                for name, value in sorted(stats.counters.items()):
+                    counters.append(f'document_portal_stage_items_total{{{label},kind="{name}"}} {value:g}')
+                errors.append(f"document_portal_stage_errors_total{{{label}}} {stats.errors}")
+        return "\n".join(lines + summary + counters + errors) + "\n"
+
+    def export_metrics(self, path: Optional[str] = None) -> Path:
+        """Atomically write the metrics file."""
+        target = Path(path) if path else self.metrics_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+        tmp.write_text(self.render_metrics(), encoding="utf-8")
+        os.replace(tmp, target)
+        self._last_export = time.monotonic()
+        return target
+
+    def close(self):
+        if not self.enabled:
+            return
+        try:
+            if self._stats:
+                self.export_metrics()
+            with self._lock:
+                if self._trace_file is not None:
+                    self._trace_file.close()
+                    self._trace_file = None
+        except Exception as e:
+            log.warning("Failed to close tracer", error=str(e))
+
+
+def usage_attrs(message) -> dict:
+    """Token counts from an LLM message's usage metadata, if the provider reports them."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {k: usage[k] for k in ("input_tokens", "output_tokens", "total_tokens") if k in usage}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that records LLM and retriever runs inside a chain as spans,
+    for chains whose stages cannot be wrapped directly.
+    """
+    def __init__(self, tracer: "Tracer", session_id: Optional[str] = None, llm_stage: str = "llm"):
+        self.tracer = tracer
+        self.session_id = session_id
+        self.llm_stage = llm_stage
+        self._starts = {}
+        self._retriever_runs = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is None:
+            return
+        attrs = {}
+        for generations in response.generations:
+            for generation in generations:
+                for key, value in usage_attrs(getattr(generation, "message", None)).items():
+                    attrs[key] = attrs.get(key, 0) + value
+        self.tracer.record(self.llm_stage, (time.perf_counter() - start) * 1000, session_id=self.session_id, **attrs)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.tracer.record(self.llm_stage, (time.perf_counter() - start) * 1000, session_id=self.session_id, status="error")
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._retriever_runs.add(run_id)
+        # a retriever nested in another (e.g. the vector side of hybrid retrieval) is part of its span
+        if parent_run_id not in self._retriever_runs:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._retriever_runs.discard(run_id)
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.tracer.record("retrieval", (time.perf_counter() - start) * 1000, session_id=self.session_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._retriever_runs.discard(run_id)
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            self.tracer.record("retrieval", (time.perf_counter() - start) * 1000, session_id=self.session_id, status="error")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from the tracing block in config.yaml."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            tracing_config = load_config().get("tracing", {})
+            _tracer = Tracer(
+                trace_path=tracing_config.get("trace_path", "traces/trace.jsonl"),
+                metrics_path=tracing_config.get("metrics_path", "traces/metrics.prom"),
+                enabled=tracing_config.get("enabled", True),
+                export_interval_s=tracing_config.get("export_interval_s", 10.0),
+            )
+            atexit.register(_tracer.close)
+        return _tracer